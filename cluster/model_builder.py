@@ -13,57 +13,76 @@ Usage:
 """
 
 import argparse
+import fnmatch
+import hashlib
+import importlib.util
 import json
-import struct
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import math
 
+import numpy as np
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # Optional: faster JSON encoding
+    orjson = None
+    _loads = json.loads
+
+try:  # Optional: binary deployment plans
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:  # Optional: zstd-compressed deployment plans
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:  # Optional: NVRTC for build-time PTX (cuda-python)
+    from cuda.bindings import nvrtc
+except ImportError:
+    try:
+        from cuda import nvrtc
+    except ImportError:
+        nvrtc = None
+
 # ============================================================================
 # Precision Types (2-4 byte support)
 # ============================================================================
 
 class Precision(Enum):
-    INT2 = "int2"      # 2-bit (packed into bytes)
-    INT4 = "int4"      # 4-bit (2 values per byte)
-    INT8 = "int8"      # 1 byte
-    FP16 = "fp16"      # 2 bytes
-    BF16 = "bf16"      # 2 bytes (bfloat16)
-    FP32 = "fp32"      # 4 bytes
-
-    @property
-    def bytes_per_element(self) -> float:
-        mapping = {
-            "int2": 0.25,
-            "int4": 0.5,
-            "int8": 1,
-            "fp16": 2,
-            "bf16": 2,
-            "fp32": 4,
-        }
-        return mapping[self.value]
-
-    @property
-    def bit_width(self) -> int:
-        mapping = {
-            "int2": 2,
-            "int4": 4,
-            "int8": 8,
-            "fp16": 16,
-            "bf16": 16,
-            "fp32": 32,
-        }
-        return mapping[self.value]
+    # (value, bytes_per_element, bit_width)
+    INT2 = ("int2", 0.25, 2)   # 2-bit (packed into bytes)
+    INT4 = ("int4", 0.5, 4)    # 4-bit (2 values per byte)
+    INT8 = ("int8", 1, 8)      # 1 byte
+    FP16 = ("fp16", 2, 16)     # 2 bytes
+    BF16 = ("bf16", 2, 16)     # 2 bytes (bfloat16)
+    FP32 = ("fp32", 4, 32)     # 4 bytes
+
+    def __new__(cls, value: str, bytes_per_element: float, bit_width: int):
+        # Bind per-member constants as plain attributes so hot paths
+        # (size_bytes, packing, quantization) avoid a lookup per access.
+        member = object.__new__(cls)
+        member._value_ = value
+        member.bytes_per_element = bytes_per_element
+        member.bit_width = bit_width
+        return member
 
 
 # ============================================================================
 # Tensor Structures
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class TensorSpec:
     """Specification for a model tensor"""
     name: str
@@ -71,19 +90,12 @@ class TensorSpec:
     precision: Precision
     quantization_scale: Optional[float] = None
     quantization_zero_point: Optional[int] = None
+    numel: int = field(init=False)        # Number of elements
+    size_bytes: int = field(init=False)   # Size in bytes
 
-    @property
-    def numel(self) -> int:
-        """Number of elements"""
-        result = 1
-        for dim in self.shape:
-            result *= dim
-        return result
-
-    @property
-    def size_bytes(self) -> int:
-        """Size in bytes"""
-        return int(self.numel * self.precision.bytes_per_element)
+    def __post_init__(self) -> None:
+        self.numel = math.prod(self.shape)
+        self.size_bytes = int(self.numel * self.precision.bytes_per_element)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -98,7 +110,7 @@ class TensorSpec:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpertTensor:
     """Expert module tensor layout"""
     expert_id: str
@@ -118,7 +130,7 @@ class ExpertTensor:
 # Model Configuration
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class AtomicExpertConfig:
     """Atomic Expert Model Configuration"""
     total_experts: int = 108
@@ -156,6 +168,14 @@ class AtomicExpertConfig:
 # Quantization Engine
 # ============================================================================
 
+# Storage word types for packed sub-byte weights, with their CUDA names
+STORAGE_CTYPES: Dict[np.dtype, str] = {
+    np.dtype(np.uint8): "uint8_t",
+    np.dtype(np.uint16): "uint16_t",
+    np.dtype(np.uint32): "uint32_t",
+}
+
+
 class QuantizationEngine:
     """Low-byte quantization for GPU deployment"""
 
@@ -178,68 +198,74 @@ class QuantizationEngine:
 
     @staticmethod
     def quantize_tensor(
-        values: List[float],
-        precision: Precision
+        values: np.ndarray,
+        precision: Precision,
+        storage_dtype: np.dtype = np.uint8,
     ) -> Tuple[bytes, float, int]:
         """Quantize float values to specified precision"""
-        if not values:
+        values = np.asarray(values, dtype=np.float32)
+        if values.size == 0:
             return b"", 1.0, 0
 
-        min_val = min(values)
-        max_val = max(values)
+        min_val = float(values.min())
+        max_val = float(values.max())
         scale, zero_point = QuantizationEngine.compute_scale_zp(
             min_val, max_val, precision
         )
 
-        # Quantize values
-        quantized = []
-        for v in values:
-            q = int(round(v / scale)) + zero_point
-            q = max(0, min((1 << precision.bit_width) - 1, q))
-            quantized.append(q)
+        # Quantize values (whole tensor at once)
+        qmax = (1 << precision.bit_width) - 1
+        quantized = np.clip(
+            np.rint(values / scale).astype(np.int64) + zero_point, 0, qmax
+        )
 
         # Pack into bytes based on precision
-        packed = QuantizationEngine._pack_values(quantized, precision)
+        packed = QuantizationEngine._pack_values(quantized, precision, storage_dtype)
         return packed, scale, zero_point
 
     @staticmethod
-    def _pack_values(values: List[int], precision: Precision) -> bytes:
+    def _pack_bits(values: np.ndarray, bits: int, storage_dtype: np.dtype) -> bytes:
+        """Pack `bits`-wide values into little-endian words of storage_dtype"""
+        dtype = np.dtype(storage_dtype)
+        if dtype not in STORAGE_CTYPES:
+            raise ValueError(f"Unsupported storage dtype: {dtype}")
+        per_word = dtype.itemsize * 8 // bits
+
+        q = np.asarray(values).astype(dtype) & ((1 << bits) - 1)
+        q = np.pad(q, (0, (-q.size) % per_word)).reshape(-1, per_word)
+        shifts = np.arange(per_word, dtype=dtype) * bits
+        packed = np.bitwise_or.reduce(q << shifts, axis=1)
+        return packed.astype(dtype.newbyteorder("<")).tobytes()
+
+    @staticmethod
+    def _pack_values(
+        values: np.ndarray,
+        precision: Precision,
+        storage_dtype: np.dtype = np.uint8,
+    ) -> bytes:
         """Pack quantized values into bytes"""
         if precision == Precision.INT2:
             # Pack 4 values per byte
-            packed = bytearray()
-            for i in range(0, len(values), 4):
-                byte = 0
-                for j in range(4):
-                    if i + j < len(values):
-                        byte |= (values[i + j] & 0x3) << (j * 2)
-                packed.append(byte)
-            return bytes(packed)
+            return QuantizationEngine._pack_bits(values, 2, storage_dtype)
 
         elif precision == Precision.INT4:
-            # Pack 2 values per byte
-            packed = bytearray()
-            for i in range(0, len(values), 2):
-                low = values[i] & 0xF
-                high = (values[i + 1] & 0xF) if i + 1 < len(values) else 0
-                packed.append(low | (high << 4))
-            return bytes(packed)
+            # Pack 2 values per byte (8 per uint32 word)
+            return QuantizationEngine._pack_bits(values, 4, storage_dtype)
 
         elif precision == Precision.INT8:
-            return bytes(values)
+            return np.asarray(values).astype(np.uint8).tobytes()
+
+        elif precision == Precision.FP16:
+            return np.asarray(values, dtype=np.float32).astype(np.float16).tobytes()
 
-        elif precision in (Precision.FP16, Precision.BF16):
-            # Use struct for fp16
-            packed = bytearray()
-            for v in values:
-                packed.extend(struct.pack('e', v))  # 'e' = fp16
-            return bytes(packed)
+        elif precision == Precision.BF16:
+            # Upper 16 bits of fp32, rounded to nearest even
+            bits = np.asarray(values, dtype=np.float32).view(np.uint32)
+            bits = (bits + ((bits >> 16) & 1) + 0x7FFF) >> 16
+            return bits.astype(np.uint16).tobytes()
 
         elif precision == Precision.FP32:
-            packed = bytearray()
-            for v in values:
-                packed.extend(struct.pack('f', v))
-            return bytes(packed)
+            return np.asarray(values, dtype=np.float32).tobytes()
 
         return b""
 
@@ -254,9 +280,28 @@ class ExpertBuilder:
     def __init__(self, config: AtomicExpertConfig):
         self.config = config
         self.quantizer = QuantizationEngine()
+        self._expert_cache: Dict[str, ExpertTensor] = {}
+
+        # Every expert shares the same layout: up/gate are [expert, hidden],
+        # down is [hidden, expert], so one projection size covers all three.
+        proj = TensorSpec(
+            name="expert.proj",
+            shape=(config.expert_dim, config.hidden_dim),
+            precision=config.expert_precision,
+        )
+        self.bytes_per_expert = 3 * proj.size_bytes
 
     def build_expert(self, expert_id: str) -> ExpertTensor:
-        """Build tensor specs for a single expert"""
+        """Build tensor specs for a single expert (memoized per expert_id)"""
+        cached = self._expert_cache.get(expert_id)
+        if cached is not None:
+            return cached
+
+        expert = self._make_expert(expert_id)
+        self._expert_cache[expert_id] = expert
+        return expert
+
+    def _make_expert(self, expert_id: str) -> ExpertTensor:
         precision = self.config.expert_precision
 
         up_proj = TensorSpec(
@@ -292,16 +337,26 @@ class ExpertBuilder:
             precision=self.config.router_precision,
         )
 
+    def size_only(self) -> Tuple[int, int]:
+        """(bytes per expert, router bytes) straight from the config dimensions"""
+        router_numel = self.config.shared_dim * self.config.total_experts
+        return self.bytes_per_expert, int(router_numel * self.config.router_precision.bytes_per_element)
+
     def build_all_experts(self, expert_ids: List[str]) -> List[ExpertTensor]:
         """Build all expert tensors"""
         return [self.build_expert(eid) for eid in expert_ids]
 
+    def iter_experts(self, expert_ids: Iterable[str]) -> Iterator[ExpertTensor]:
+        """Yield expert tensors one at a time without caching them"""
+        for eid in expert_ids:
+            yield self._expert_cache.get(eid) or self._make_expert(eid)
+
 
 # ============================================================================
 # Cluster Builder
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class NodeAllocation:
     """Expert allocation to a cluster node"""
     node_id: str
@@ -311,6 +366,19 @@ class NodeAllocation:
     memory_used: int = 0
 
 
+# Characters that make an expert pattern a glob rather than a literal ID
+_GLOB_CHARS = frozenset("*?[")
+
+# Longest suffix first so "GB" is not mistaken for "B"
+_MEMORY_UNITS: Tuple[Tuple[str, int], ...] = (
+    ("TB", 1024**4),
+    ("GB", 1024**3),
+    ("MB", 1024**2),
+    ("KB", 1024),
+    ("B", 1),
+)
+
+
 class ClusterBuilder:
     """Build cluster allocation plan"""
 
@@ -318,22 +386,49 @@ class ClusterBuilder:
         self.config = config
         self.expert_config = expert_config
         self.expert_builder = ExpertBuilder(expert_config)
+        self._pattern_cache: Dict[str, re.Pattern] = {}
 
     def parse_memory(self, mem_str: str) -> int:
         """Parse memory string like '16GB' to bytes"""
-        units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
         mem_str = mem_str.upper().strip()
-        for unit, multiplier in units.items():
+        for unit, multiplier in _MEMORY_UNITS:
             if mem_str.endswith(unit):
                 return int(float(mem_str[:-len(unit)]) * multiplier)
         return int(mem_str)
 
-    def expand_expert_pattern(self, pattern: str, all_experts: List[str]) -> List[str]:
-        """Expand wildcard pattern like 'math-*' to matching experts"""
-        if pattern.endswith("*"):
-            prefix = pattern[:-1]
-            return [e for e in all_experts if e.startswith(prefix)]
-        return [pattern] if pattern in all_experts else []
+    @staticmethod
+    def index_experts(all_experts: List[str]) -> Dict[str, List[str]]:
+        """Group experts by category prefix, e.g. 'math-' -> ['math-algebra', ...]"""
+        by_prefix: Dict[str, List[str]] = {}
+        for expert_id in all_experts:
+            head, sep, _ = expert_id.partition("-")
+            if sep:
+                by_prefix.setdefault(head + sep, []).append(expert_id)
+        return by_prefix
+
+    def expand_expert_pattern(
+        self,
+        pattern: str,
+        all_experts: List[str],
+        by_prefix: Optional[Dict[str, List[str]]] = None,
+        expert_set: Optional[Set[str]] = None,
+    ) -> List[str]:
+        """Expand glob pattern like 'math-*' or 'lang-?y*' to matching experts"""
+        if not _GLOB_CHARS.intersection(pattern):
+            known = expert_set if expert_set is not None else all_experts
+            return [pattern] if pattern in known else []
+
+        # Fast path: plain category wildcard such as 'math-*'
+        prefix = pattern[:-1]
+        if by_prefix is not None and pattern.endswith("*") and prefix in by_prefix \
+                and not _GLOB_CHARS.intersection(prefix):
+            return list(by_prefix[prefix])
+
+        compiled = self._pattern_cache.get(pattern)
+        if compiled is None:
+            compiled = re.compile(fnmatch.translate(pattern))
+            self._pattern_cache[pattern] = compiled
+        return [e for e in all_experts if compiled.match(e)]
 
     def build_allocation(self) -> List[NodeAllocation]:
         """Build expert allocation across cluster nodes"""
@@ -344,6 +439,8 @@ class ClusterBuilder:
         all_experts = []
         for category, cat_config in registry.get("categories", {}).items():
             all_experts.extend(cat_config.get("experts", []))
+        by_prefix = self.index_experts(all_experts)
+        expert_set = set(all_experts)
 
         # Build allocations
         allocations = []
@@ -357,13 +454,11 @@ class ClusterBuilder:
 
             # Expand expert patterns
             for pattern in node.get("experts", []):
-                matched = self.expand_expert_pattern(pattern, all_experts)
+                matched = self.expand_expert_pattern(pattern, all_experts, by_prefix, expert_set)
                 allocation.experts.extend(matched)
 
             # Calculate memory usage
-            for expert_id in allocation.experts:
-                expert = self.expert_builder.build_expert(expert_id)
-                allocation.memory_used += expert.total_bytes
+            allocation.memory_used = self.expert_builder.bytes_per_expert * len(allocation.experts)
 
             allocations.append(allocation)
 
@@ -444,27 +539,52 @@ class GPUKernelGenerator:
     """Generate GPU kernel code for quantized inference"""
 
     @staticmethod
-    def generate_dequant_kernel(precision: Precision) -> str:
+    def generate_dequant_kernel(
+        precision: Precision,
+        storage_dtype: np.dtype = np.uint8,
+    ) -> str:
         """Generate CUDA dequantization kernel"""
         if precision == Precision.INT4:
-            return '''
-// INT4 Dequantization Kernel
+            dtype = np.dtype(storage_dtype)
+            if dtype not in STORAGE_CTYPES:
+                raise ValueError(f"Unsupported storage dtype: {dtype}")
+            ctype = STORAGE_CTYPES[dtype]
+            per_word = dtype.itemsize * 2
+            return f'''
+// INT4 Dequantization Kernel ({per_word} nibbles per {ctype})
+// Launch: ceil(num_elements / 8) threads. Each thread loads one uint32
+// (8 packed nibbles) and writes 8 outputs as two float4 stores.
 __global__ void dequant_int4_kernel(
-    const uint8_t* __restrict__ input,
+    const {ctype}* __restrict__ input,
     float* __restrict__ output,
     const float scale,
     const int zero_point,
     const int num_elements
-) {
-    int idx = blockIdx.x * blockDim.x + threadIdx.x;
-    int packed_idx = idx / 2;
+) {{
+    int base = (blockIdx.x * blockDim.x + threadIdx.x) * 8;
 
-    if (idx < num_elements) {
-        uint8_t packed = input[packed_idx];
-        int nibble = (idx % 2 == 0) ? (packed & 0xF) : ((packed >> 4) & 0xF);
-        output[idx] = (float)(nibble - zero_point) * scale;
-    }
-}
+    if (base + 8 <= num_elements) {{
+        uint32_t packed = *reinterpret_cast<const uint32_t*>(input + base / {per_word});
+        float v[8];
+
+        #pragma unroll
+        for (int k = 0; k < 8; k++) {{
+            int nibble = (packed >> (k * 4)) & 0xF;
+            v[k] = (float)(nibble - zero_point) * scale;
+        }}
+
+        float4* out4 = reinterpret_cast<float4*>(output + base);
+        out4[0] = make_float4(v[0], v[1], v[2], v[3]);
+        out4[1] = make_float4(v[4], v[5], v[6], v[7]);
+    }} else {{
+        // Tail: scalar path for the last partial group
+        for (int idx = base; idx < num_elements; idx++) {{
+            {ctype} word = input[idx / {per_word}];
+            int nibble = (word >> ((idx % {per_word}) * 4)) & 0xF;
+            output[idx] = (float)(nibble - zero_point) * scale;
+        }}
+    }}
+}}
 '''
         elif precision == Precision.INT8:
             return '''
@@ -506,128 +626,621 @@ __global__ void dequant_int2_kernel(
         return ""
 
     @staticmethod
-    def generate_expert_forward(config: AtomicExpertConfig) -> str:
-        """Generate expert forward pass kernel"""
+    def generate_expert_forward(config: AtomicExpertConfig, use_fp16: bool = False) -> str:
+        """Generate expert forward pass kernel (float4-vectorized, or __half2 when use_fp16)"""
+        if use_fp16:
+            return GPUKernelGenerator._generate_expert_forward_half2(config)
+        E, H = config.expert_dim, config.hidden_dim
+        if E % 4 or H % 4:
+            raise ValueError(
+                f"expert_dim ({E}) and hidden_dim ({H}) must be multiples of 4 for float4 loads"
+            )
+        E4, H4 = E // 4, H // 4
         return f'''
 // Expert Forward Pass (Gated Linear Unit)
+// Launch: grid = batch_size, block = {H4} threads.
+// Each thread owns 4 adjacent columns and moves them with 128-bit float4 loads/stores.
 __global__ void expert_forward_kernel(
-    const float* __restrict__ input,      // [batch, {config.expert_dim}]
-    const float* __restrict__ up_proj,    // [{config.expert_dim}, {config.hidden_dim}]
-    const float* __restrict__ gate_proj,  // [{config.expert_dim}, {config.hidden_dim}]
-    const float* __restrict__ down_proj,  // [{config.hidden_dim}, {config.expert_dim}]
-    float* __restrict__ output,           // [batch, {config.expert_dim}]
+    const float* __restrict__ input,      // [batch, {E}]
+    const float* __restrict__ up_proj,    // [{E}, {H}]
+    const float* __restrict__ gate_proj,  // [{E}, {H}]
+    const float* __restrict__ down_proj,  // [{H}, {E}]
+    float* __restrict__ output,           // [batch, {E}]
     const int batch_size
 ) {{
-    // Shared memory for intermediate results
-    __shared__ float gate_out[{config.hidden_dim}];
-    __shared__ float up_out[{config.hidden_dim}];
+    // Shared memory for the input row and intermediate results
+    __shared__ __align__(16) float in_row[{E}];
+    __shared__ __align__(16) float hidden[{H}];
+
+    const int batch_idx = blockIdx.x;
+    if (batch_idx >= batch_size) return;  // uniform per block
+    const int tid = threadIdx.x;
+
+    // Stage the input row once
+    const float4* in4 = reinterpret_cast<const float4*>(input + batch_idx * {E});
+    for (int i = tid; i < {E4}; i += blockDim.x) {{
+        reinterpret_cast<float4*>(in_row)[i] = in4[i];
+    }}
+    __syncthreads();
+
+    // Gate and up projections, 4 hidden columns per thread
+    const float4* gate4 = reinterpret_cast<const float4*>(gate_proj);
+    const float4* up4 = reinterpret_cast<const float4*>(up_proj);
+    for (int c = tid; c < {H4}; c += blockDim.x) {{
+        float4 g = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
+        float4 u = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
+
+        #pragma unroll 4
+        for (int i = 0; i < {E}; i++) {{
+            const float x = in_row[i];
+            const float4 wg = gate4[i * {H4} + c];
+            const float4 wu = up4[i * {H4} + c];
+            g.x = fmaf(x, wg.x, g.x); g.y = fmaf(x, wg.y, g.y);
+            g.z = fmaf(x, wg.z, g.z); g.w = fmaf(x, wg.w, g.w);
+            u.x = fmaf(x, wu.x, u.x); u.y = fmaf(x, wu.y, u.y);
+            u.z = fmaf(x, wu.z, u.z); u.w = fmaf(x, wu.w, u.w);
+        }}
 
-    int batch_idx = blockIdx.x;
-    int hidden_idx = threadIdx.x;
+        // SiLU activation on gate, multiply with up
+        float4 h;
+        h.x = g.x / (1.0f + __expf(-g.x)) * u.x;
+        h.y = g.y / (1.0f + __expf(-g.y)) * u.y;
+        h.z = g.z / (1.0f + __expf(-g.z)) * u.z;
+        h.w = g.w / (1.0f + __expf(-g.w)) * u.w;
+        reinterpret_cast<float4*>(hidden)[c] = h;
+    }}
+    __syncthreads();
+
+    // Down projection, 4 output columns per thread
+    const float4* down4 = reinterpret_cast<const float4*>(down_proj);
+    float4* out4 = reinterpret_cast<float4*>(output + batch_idx * {E});
+    for (int c = tid; c < {E4}; c += blockDim.x) {{
+        float4 acc = make_float4(0.0f, 0.0f, 0.0f, 0.0f);
+
+        #pragma unroll 4
+        for (int j = 0; j < {H}; j++) {{
+            const float hv = hidden[j];
+            const float4 w = down4[j * {E4} + c];
+            acc.x = fmaf(hv, w.x, acc.x); acc.y = fmaf(hv, w.y, acc.y);
+            acc.z = fmaf(hv, w.z, acc.z); acc.w = fmaf(hv, w.w, acc.w);
+        }}
+        out4[c] = acc;
+    }}
+}}
+'''
+
+    @staticmethod
+    def _generate_expert_forward_half2(config: AtomicExpertConfig) -> str:
+        """Generate fp16 expert forward pass kernel using paired __half2 math"""
+        E, H = config.expert_dim, config.hidden_dim
+        chunk = 32
+        if E % chunk or H % chunk:
+            raise ValueError(
+                f"expert_dim ({E}) and hidden_dim ({H}) must be multiples of {chunk} for the fp16 kernel"
+            )
+        E2, H2 = E // 2, H // 2
+        return f'''
+// Expert Forward Pass (Gated Linear Unit, fp16)
+// Launch: grid = batch_size, block = {min(H2, 1024)} threads.
+// Each thread owns 2 adjacent columns as one __half2, so every __hfma2 does two
+// multiply-adds. Partial sums are flushed to fp32 every {chunk} steps to bound
+// fp16 rounding error.
+#include <cuda_fp16.h>
 
-    if (batch_idx < batch_size && hidden_idx < {config.hidden_dim}) {{
-        // Compute gate and up projections
-        float gate_sum = 0.0f;
-        float up_sum = 0.0f;
+__global__ void expert_forward_kernel(
+    const __half* __restrict__ input,      // [batch, {E}]
+    const __half* __restrict__ up_proj,    // [{E}, {H}]
+    const __half* __restrict__ gate_proj,  // [{E}, {H}]
+    const __half* __restrict__ down_proj,  // [{H}, {E}]
+    __half* __restrict__ output,           // [batch, {E}]
+    const int batch_size
+) {{
+    // Shared memory for the input row and intermediate results
+    __shared__ __half in_row[{E}];
+    __shared__ __half hidden[{H}];
 
-        for (int i = 0; i < {config.expert_dim}; i++) {{
-            float in_val = input[batch_idx * {config.expert_dim} + i];
-            gate_sum += in_val * gate_proj[i * {config.hidden_dim} + hidden_idx];
-            up_sum += in_val * up_proj[i * {config.hidden_dim} + hidden_idx];
+    const int batch_idx = blockIdx.x;
+    if (batch_idx >= batch_size) return;  // uniform per block
+    const int tid = threadIdx.x;
+
+    // Stage the input row once
+    for (int i = tid; i < {E}; i += blockDim.x) {{
+        in_row[i] = input[batch_idx * {E} + i];
+    }}
+    __syncthreads();
+
+    // Gate and up projections, 2 hidden columns per thread
+    const __half2* gate2 = reinterpret_cast<const __half2*>(gate_proj);
+    const __half2* up2 = reinterpret_cast<const __half2*>(up_proj);
+    for (int c = tid; c < {H2}; c += blockDim.x) {{
+        float2 g = make_float2(0.0f, 0.0f);
+        float2 u = make_float2(0.0f, 0.0f);
+
+        for (int i0 = 0; i0 < {E}; i0 += {chunk}) {{
+            __half2 g2 = __float2half2_rn(0.0f);
+            __half2 u2 = __float2half2_rn(0.0f);
+
+            #pragma unroll 8
+            for (int i = i0; i < i0 + {chunk}; i++) {{
+                const __half2 x2 = __half2half2(in_row[i]);
+                g2 = __hfma2(x2, gate2[i * {H2} + c], g2);
+                u2 = __hfma2(x2, up2[i * {H2} + c], u2);
+            }}
+
+            const float2 gf = __half22float2(g2);
+            const float2 uf = __half22float2(u2);
+            g.x += gf.x; g.y += gf.y;
+            u.x += uf.x; u.y += uf.y;
         }}
 
         // SiLU activation on gate, multiply with up
-        float silu_gate = gate_sum / (1.0f + expf(-gate_sum));
-        float hidden_val = silu_gate * up_sum;
+        const float h0 = g.x / (1.0f + __expf(-g.x)) * u.x;
+        const float h1 = g.y / (1.0f + __expf(-g.y)) * u.y;
+        reinterpret_cast<__half2*>(hidden)[c] = __floats2half2_rn(h0, h1);
+    }}
+    __syncthreads();
 
-        gate_out[hidden_idx] = hidden_val;
-        __syncthreads();
+    // Down projection, 2 output columns per thread
+    const __half2* down2 = reinterpret_cast<const __half2*>(down_proj);
+    __half2* out2 = reinterpret_cast<__half2*>(output + batch_idx * {E});
+    for (int c = tid; c < {E2}; c += blockDim.x) {{
+        float2 acc = make_float2(0.0f, 0.0f);
 
-        // Down projection (parallel reduction)
-        if (hidden_idx < {config.expert_dim}) {{
-            float out_sum = 0.0f;
-            for (int j = 0; j < {config.hidden_dim}; j++) {{
-                out_sum += gate_out[j] * down_proj[j * {config.expert_dim} + hidden_idx];
+        for (int j0 = 0; j0 < {H}; j0 += {chunk}) {{
+            __half2 acc2 = __float2half2_rn(0.0f);
+
+            #pragma unroll 8
+            for (int j = j0; j < j0 + {chunk}; j++) {{
+                acc2 = __hfma2(__half2half2(hidden[j]), down2[j * {E2} + c], acc2);
             }}
-            output[batch_idx * {config.expert_dim} + hidden_idx] = out_sum;
+
+            const float2 af = __half22float2(acc2);
+            acc.x += af.x; acc.y += af.y;
         }}
+        out2[c] = __floats2half2_rn(acc.x, acc.y);
     }}
 }}
 '''
 
     @staticmethod
     def generate_router_kernel(config: AtomicExpertConfig) -> str:
-        """Generate top-k router kernel"""
+        """Generate top-k router kernel (one warp per sample)"""
+        E, D, K = config.total_experts, config.shared_dim, config.active_experts
+        per_lane = (E + 31) // 32
         return f'''
 // Top-K Router Kernel
+// Launch: grid = batch_size, block = 32 (one warp per sample).
+// Lane l owns experts l, l + 32, ...; max/sum/argmax are warp shuffle reductions.
 __global__ void router_topk_kernel(
-    const float* __restrict__ input,       // [batch, {config.shared_dim}]
-    const float* __restrict__ router_w,    // [{config.shared_dim}, {config.total_experts}]
-    int* __restrict__ expert_indices,      // [batch, {config.active_experts}]
-    float* __restrict__ expert_weights,    // [batch, {config.active_experts}]
+    const float* __restrict__ input,       // [batch, {D}]
+    const float* __restrict__ router_w,    // [{D}, {E}]
+    int* __restrict__ expert_indices,      // [batch, {K}]
+    float* __restrict__ expert_weights,    // [batch, {K}]
     const int batch_size
 ) {{
+    const unsigned FULL_MASK = 0xffffffffu;
     int batch_idx = blockIdx.x;
+    int lane = threadIdx.x & 31;
 
-    if (batch_idx < batch_size) {{
-        // Compute router logits
-        float logits[{config.total_experts}];
+    if (batch_idx >= batch_size) return;
 
-        for (int e = 0; e < {config.total_experts}; e++) {{
-            float sum = 0.0f;
-            for (int d = 0; d < {config.shared_dim}; d++) {{
-                sum += input[batch_idx * {config.shared_dim} + d] *
-                       router_w[d * {config.total_experts} + e];
-            }}
-            logits[e] = sum;
-        }}
+    // Compute router logits for this lane's experts
+    float logits[{per_lane}];
 
-        // Softmax normalization
-        float max_logit = logits[0];
-        for (int e = 1; e < {config.total_experts}; e++) {{
-            if (logits[e] > max_logit) max_logit = logits[e];
+    #pragma unroll
+    for (int s = 0; s < {per_lane}; s++) {{
+        int e = lane + s * 32;
+        float sum = -INFINITY;
+        if (e < {E}) {{
+            sum = 0.0f;
+            for (int d = 0; d < {D}; d++) {{
+                sum = fmaf(input[batch_idx * {D} + d], router_w[d * {E} + e], sum);
+            }}
         }}
+        logits[s] = sum;
+    }}
 
-        float sum_exp = 0.0f;
-        for (int e = 0; e < {config.total_experts}; e++) {{
-            logits[e] = expf(logits[e] - max_logit);
-            sum_exp += logits[e];
-        }}
+    // Softmax normalization (warp-wide max and sum)
+    float max_logit = -INFINITY;
+    #pragma unroll
+    for (int s = 0; s < {per_lane}; s++) {{
+        max_logit = fmaxf(max_logit, logits[s]);
+    }}
+    for (int offset = 16; offset > 0; offset >>= 1) {{
+        max_logit = fmaxf(max_logit, __shfl_xor_sync(FULL_MASK, max_logit, offset));
+    }}
 
-        for (int e = 0; e < {config.total_experts}; e++) {{
-            logits[e] /= sum_exp;
-        }}
+    float sum_exp = 0.0f;
+    #pragma unroll
+    for (int s = 0; s < {per_lane}; s++) {{
+        logits[s] = (lane + s * 32 < {E}) ? __expf(logits[s] - max_logit) : 0.0f;
+        sum_exp += logits[s];
+    }}
+    for (int offset = 16; offset > 0; offset >>= 1) {{
+        sum_exp += __shfl_xor_sync(FULL_MASK, sum_exp, offset);
+    }}
 
-        // Top-K selection
-        for (int k = 0; k < {config.active_experts}; k++) {{
-            int max_idx = 0;
-            float max_val = -1.0f;
+    float inv_sum = 1.0f / sum_exp;
+    #pragma unroll
+    for (int s = 0; s < {per_lane}; s++) {{
+        // Padding slots get -1 so they are never selected
+        logits[s] = (lane + s * 32 < {E}) ? logits[s] * inv_sum : -1.0f;
+    }}
 
-            for (int e = 0; e < {config.total_experts}; e++) {{
-                if (logits[e] > max_val) {{
-                    max_val = logits[e];
-                    max_idx = e;
-                }}
+    // Top-K selection: K rounds of warp-wide argmax
+    int top_idx[{K}];
+    float top_val[{K}];
+    float weight_sum = 0.0f;
+
+    #pragma unroll
+    for (int k = 0; k < {K}; k++) {{
+        float best_val = -1.0f;
+        int best_idx = {E};
+
+        #pragma unroll
+        for (int s = 0; s < {per_lane}; s++) {{
+            if (logits[s] > best_val) {{
+                best_val = logits[s];
+                best_idx = lane + s * 32;
             }}
+        }}
 
-            expert_indices[batch_idx * {config.active_experts} + k] = max_idx;
-            expert_weights[batch_idx * {config.active_experts} + k] = max_val;
-            logits[max_idx] = -1.0f;  // Mark as selected
+        for (int offset = 16; offset > 0; offset >>= 1) {{
+            float other_val = __shfl_xor_sync(FULL_MASK, best_val, offset);
+            int other_idx = __shfl_xor_sync(FULL_MASK, best_idx, offset);
+            if (other_val > best_val || (other_val == best_val && other_idx < best_idx)) {{
+                best_val = other_val;
+                best_idx = other_idx;
+            }}
         }}
 
-        // Renormalize top-k weights
-        float weight_sum = 0.0f;
-        for (int k = 0; k < {config.active_experts}; k++) {{
-            weight_sum += expert_weights[batch_idx * {config.active_experts} + k];
+        // Owning lane marks the winner as selected
+        #pragma unroll
+        for (int s = 0; s < {per_lane}; s++) {{
+            if (lane + s * 32 == best_idx) logits[s] = -1.0f;
         }}
-        for (int k = 0; k < {config.active_experts}; k++) {{
-            expert_weights[batch_idx * {config.active_experts} + k] /= weight_sum;
+
+        top_idx[k] = best_idx;
+        top_val[k] = best_val;
+        weight_sum += best_val;
+    }}
+
+    // Renormalize top-k weights
+    if (lane == 0) {{
+        float inv_weight_sum = 1.0f / weight_sum;
+        #pragma unroll
+        for (int k = 0; k < {K}; k++) {{
+            expert_indices[batch_idx * {K} + k] = top_idx[k];
+            expert_weights[batch_idx * {K} + k] = top_val[k] * inv_weight_sum;
         }}
     }}
 }}
 '''
 
 
+    @staticmethod
+    def generate_fused_dequant_gemm(precision: Precision) -> str:
+        """Generate fused dequant + tensor-core GEMM kernels (weights stay packed in global memory)"""
+        if precision != Precision.INT4:
+            return ""
+        return '''
+// Fused INT4 Dequant + GEMM Kernels (WMMA tensor cores)
+// Weights are dequantized in registers per 16x16 tile; no FP32 weight copy
+// is ever materialized. Activations are fp16, accumulation is fp32.
+// Requires M, N, K to be multiples of 16.
+#include <cuda_fp16.h>
+#include <mma.h>
+using namespace nvcuda;
+
+#define TILE 16
+#define WARPS_PER_BLOCK 4
+
+// Unpack one 16x16 tile of W[K, N] (row-major, 2 nibbles per byte, low
+// nibble = even column) into shared memory as fp16 (q - zero_point).
+// Each lane handles one uint32 (8 nibbles). The mask/or sequence compiles
+// to lop3.b32 and uses the fp16 magic number: half(0x6400 | q) == 1024 + q.
+__device__ __forceinline__ void dequant_int4_tile(
+    const uint8_t* __restrict__ w,
+    const int N,
+    const int k0,
+    const int n0,
+    half* __restrict__ tile,
+    const __half2 bias2
+) {
+    int lane = threadIdx.x & 31;
+    int row = lane >> 1;
+    int col = (lane & 1) * 8;
+
+    uint32_t packed = *reinterpret_cast<const uint32_t*>(
+        w + ((size_t)(k0 + row) * N + n0 + col) / 2);
+    __half2* dst = reinterpret_cast<__half2*>(tile + row * TILE + col);
+
+    #pragma unroll
+    for (int j = 0; j < 4; j++) {
+        uint32_t pair = packed >> (j * 8);
+        uint32_t bits = (pair & 0xF) | ((pair & 0xF0) << 12) | 0x64006400u;
+        dst[j] = __hsub2(*reinterpret_cast<__half2*>(&bits), bias2);
+    }
+}
+
+// C[M, N] = A[M, K] x dequant(W[K, N])
+// Launch: grid = (N / (TILE * WARPS_PER_BLOCK), M / TILE), block = 32 * WARPS_PER_BLOCK
+__global__ void fused_dequant_gemm_int4_kernel(
+    const half* __restrict__ A,
+    const uint8_t* __restrict__ W,
+    float* __restrict__ C,
+    const float scale,
+    const int zero_point,
+    const int M,
+    const int N,
+    const int K
+) {
+    __shared__ __align__(32) half w_tile[WARPS_PER_BLOCK][TILE * TILE];
+
+    int warp = threadIdx.x >> 5;
+    int m0 = blockIdx.y * TILE;
+    int n0 = (blockIdx.x * WARPS_PER_BLOCK + warp) * TILE;
+    if (m0 >= M || n0 >= N) return;  // warp-uniform
+
+    const __half2 bias2 = __float2half2_rn(1024.0f + zero_point);
+
+    wmma::fragment<wmma::matrix_a, TILE, TILE, TILE, half, wmma::row_major> a_frag;
+    wmma::fragment<wmma::matrix_b, TILE, TILE, TILE, half, wmma::row_major> b_frag;
+    wmma::fragment<wmma::accumulator, TILE, TILE, TILE, float> acc;
+    wmma::fill_fragment(acc, 0.0f);
+
+    for (int k0 = 0; k0 < K; k0 += TILE) {
+        dequant_int4_tile(W, N, k0, n0, w_tile[warp], bias2);
+        __syncwarp();
+        wmma::load_matrix_sync(a_frag, A + (size_t)m0 * K + k0, K);
+        wmma::load_matrix_sync(b_frag, w_tile[warp], TILE);
+        wmma::mma_sync(acc, a_frag, b_frag, acc);
+        __syncwarp();
+    }
+
+    // Per-tensor scale applied once to the fp32 accumulator
+    for (int i = 0; i < acc.num_elements; i++) {
+        acc.x[i] *= scale;
+    }
+    wmma::store_matrix_sync(C + (size_t)m0 * N + n0, acc, N, wmma::mem_row_major);
+}
+
+// hidden[M, H] = SiLU(X x dequant(gate_w)) * (X x dequant(up_w)), hidden in fp16
+// Launch: grid = (H / (TILE * WARPS_PER_BLOCK), M / TILE), block = 32 * WARPS_PER_BLOCK
+// Follow with fused_dequant_gemm_int4_kernel(hidden, down_w) for the down projection.
+__global__ void fused_dequant_glu_int4_kernel(
+    const half* __restrict__ X,
+    const uint8_t* __restrict__ gate_w,
+    const uint8_t* __restrict__ up_w,
+    half* __restrict__ hidden,
+    const float gate_scale,
+    const int gate_zero_point,
+    const float up_scale,
+    const int up_zero_point,
+    const int M,
+    const int H,
+    const int K
+) {
+    __shared__ __align__(32) half g_tile[WARPS_PER_BLOCK][TILE * TILE];
+    __shared__ __align__(32) half u_tile[WARPS_PER_BLOCK][TILE * TILE];
+    __shared__ __align__(32) float out_tile[WARPS_PER_BLOCK][TILE * TILE];
+
+    int warp = threadIdx.x >> 5;
+    int lane = threadIdx.x & 31;
+    int m0 = blockIdx.y * TILE;
+    int n0 = (blockIdx.x * WARPS_PER_BLOCK + warp) * TILE;
+    if (m0 >= M || n0 >= H) return;  // warp-uniform
+
+    const __half2 gate_bias2 = __float2half2_rn(1024.0f + gate_zero_point);
+    const __half2 up_bias2 = __float2half2_rn(1024.0f + up_zero_point);
+
+    wmma::fragment<wmma::matrix_a, TILE, TILE, TILE, half, wmma::row_major> x_frag;
+    wmma::fragment<wmma::matrix_b, TILE, TILE, TILE, half, wmma::row_major> g_frag;
+    wmma::fragment<wmma::matrix_b, TILE, TILE, TILE, half, wmma::row_major> u_frag;
+    wmma::fragment<wmma::accumulator, TILE, TILE, TILE, float> gate_acc;
+    wmma::fragment<wmma::accumulator, TILE, TILE, TILE, float> up_acc;
+    wmma::fill_fragment(gate_acc, 0.0f);
+    wmma::fill_fragment(up_acc, 0.0f);
+
+    for (int k0 = 0; k0 < K; k0 += TILE) {
+        dequant_int4_tile(gate_w, H, k0, n0, g_tile[warp], gate_bias2);
+        dequant_int4_tile(up_w, H, k0, n0, u_tile[warp], up_bias2);
+        __syncwarp();
+        wmma::load_matrix_sync(x_frag, X + (size_t)m0 * K + k0, K);
+        wmma::load_matrix_sync(g_frag, g_tile[warp], TILE);
+        wmma::load_matrix_sync(u_frag, u_tile[warp], TILE);
+        wmma::mma_sync(gate_acc, x_frag, g_frag, gate_acc);
+        wmma::mma_sync(up_acc, x_frag, u_frag, up_acc);
+        __syncwarp();
+    }
+
+    // SiLU activation on gate, multiply with up (same fragment layout)
+    for (int i = 0; i < gate_acc.num_elements; i++) {
+        float g = gate_acc.x[i] * gate_scale;
+        float u = up_acc.x[i] * up_scale;
+        gate_acc.x[i] = g / (1.0f + __expf(-g)) * u;
+    }
+    wmma::store_matrix_sync(out_tile[warp], gate_acc, TILE, wmma::mem_row_major);
+    __syncwarp();
+
+    // Convert to fp16: 8 values per lane
+    int row = lane >> 1;
+    int col = (lane & 1) * 8;
+    #pragma unroll
+    for (int j = 0; j < 8; j++) {
+        hidden[(size_t)(m0 + row) * H + n0 + col + j] =
+            __float2half(out_tile[warp][row * TILE + col + j]);
+    }
+}
+'''
+
+
+# Bump whenever any generate_* template changes so stale cache entries are ignored
+KERNEL_GENERATOR_VERSION = "2"
+KERNEL_CACHE_DIR = Path(".kernel_cache")
+
+
+def cached_kernel(name: str, generate: Callable[..., str], *args: Any) -> str:
+    """Return generate(*args), reusing a copy cached on disk under
+    (name, args, KERNEL_GENERATOR_VERSION)."""
+    key = hashlib.sha256(repr((name, KERNEL_GENERATOR_VERSION, args)).encode()).hexdigest()[:16]
+    cache_path = KERNEL_CACHE_DIR / f"{name}_{key}.cu"
+    if cache_path.exists():
+        return cache_path.read_text()
+
+    source = generate(*args)
+    KERNEL_CACHE_DIR.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(source)
+    os.replace(tmp_path, cache_path)
+    return source
+
+
+# ============================================================================
+# PTX Compiler
+# ============================================================================
+
+# Generated kernels target nvcc; NVRTC has no libc headers, so provide the
+# few names they rely on.
+_NVRTC_PRELUDE = """\
+typedef signed char int8_t;
+typedef unsigned char uint8_t;
+typedef unsigned short uint16_t;
+typedef unsigned int uint32_t;
+#ifndef INFINITY
+#define INFINITY __int_as_float(0x7f800000)
+#endif
+"""
+
+
+# NVRTC's log line when a kernel's #include cannot be resolved
+_MISSING_HEADER_RE = re.compile(r'(?:could not|cannot) open source file "([^"]+)"')
+
+
+def _cuda_include_dirs() -> List[Path]:
+    """CUDA header directories: $CUDA_HOME/include, else the nvidia-* pip wheels"""
+    cuda_home = os.environ.get("CUDA_HOME") or os.environ.get("CUDA_PATH")
+    if cuda_home:
+        return [Path(cuda_home) / "include"]
+
+    # cuda-python's wheels ship headers as nvidia/cuda_runtime/include (cuda_fp16.h,
+    # cuda_bf16.h) and nvidia/cuda_nvcc/include (crt/)
+    spec = importlib.util.find_spec("nvidia")
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    return [
+        Path(location) / package / "include"
+        for location in spec.submodule_search_locations
+        for package in ("cuda_runtime", "cuda_nvcc")
+        if (Path(location) / package / "include").is_dir()
+    ]
+
+
+class PTXCompiler:
+    """Compile generated CUDA sources to PTX with NVRTC, cached per (source, arch)"""
+
+    def __init__(self, arch: str):
+        # PTX is emitted for the virtual architecture matching sm_XX
+        self.arch = "compute_" + arch.lower().replace("sm_", "").replace("compute_", "")
+        self.options = [f"--gpu-architecture={self.arch}", "--use_fast_math"]
+        self.options += [f"--include-path={path}" for path in _cuda_include_dirs()]
+
+    @staticmethod
+    def available() -> bool:
+        return nvrtc is not None
+
+    @staticmethod
+    def _check(result, prog=None) -> None:
+        if result == nvrtc.nvrtcResult.NVRTC_SUCCESS:
+            return
+        log = ""
+        if prog is not None:
+            _, size = nvrtc.nvrtcGetProgramLogSize(prog)
+            buf = b" " * size
+            nvrtc.nvrtcGetProgramLog(prog, buf)
+            log = buf.decode(errors="replace")
+        raise RuntimeError(f"NVRTC error {result}: {log}")
+
+    def compile(self, source: str, name: str) -> bytes:
+        """Compile CUDA source to PTX"""
+        err, prog = nvrtc.nvrtcCreateProgram(
+            (_NVRTC_PRELUDE + source).encode(), name.encode(), 0, [], []
+        )
+        self._check(err)
+        try:
+            opts = [o.encode() for o in self.options]
+            (err,) = nvrtc.nvrtcCompileProgram(prog, len(opts), opts)
+            self._check(err, prog)
+            err, size = nvrtc.nvrtcGetPTXSize(prog)
+            self._check(err)
+            ptx = b" " * size
+            (err,) = nvrtc.nvrtcGetPTX(prog, ptx)
+            self._check(err)
+        finally:
+            nvrtc.nvrtcDestroyProgram(prog)
+        return ptx.rstrip(b"\x00")
+
+    def compile_file(self, cu_path: Path) -> Tuple[Path, bool]:
+        """Write <stem>.ptx next to cu_path; returns (ptx_path, compiled).
+
+        Skips NVRTC when the <stem>.meta.json sidecar records the same
+        source hash and architecture.
+        """
+        source = cu_path.read_text()
+        ptx_path = cu_path.with_suffix(".ptx")
+        meta_path = cu_path.with_suffix(".meta.json")
+        meta = {
+            "source_sha256": hashlib.sha256(source.encode()).hexdigest(),
+            "arch": self.arch,
+            "options": self.options,
+        }
+
+        if ptx_path.exists() and meta_path.exists():
+            try:
+                if _loads(meta_path.read_bytes()) == meta:
+                    return ptx_path, False
+            except json.JSONDecodeError:
+                pass
+
+        ptx_path.write_bytes(self.compile(source, cu_path.name))
+        meta_path.write_text(json.dumps(meta, indent=2))
+        return ptx_path, True
+
+    def compile_files(self, cu_paths: List[Path]) -> List[Tuple[Path, bool]]:
+        """compile_file over several sources concurrently, results in input order"""
+        if len(cu_paths) <= 1:
+            return [self.compile_file(path) for path in cu_paths]
+        with ThreadPoolExecutor(max_workers=min(len(cu_paths), os.cpu_count() or 1)) as pool:
+            return list(pool.map(self.compile_file, cu_paths))
+
+
+def detect_arch(config: Dict[str, Any]) -> Optional[str]:
+    """Target arch from the first cluster node declaring gpu.compute, else the local GPU"""
+    for node in config.get("cluster", {}).get("nodes", []):
+        compute = node.get("gpu", {}).get("compute")
+        if compute:
+            return compute
+
+    try:
+        try:
+            from cuda.bindings import driver
+        except ImportError:
+            from cuda import cuda as driver
+    except ImportError:
+        return None
+
+    (err,) = driver.cuInit(0)
+    if err != driver.CUresult.CUDA_SUCCESS:
+        return None
+    err, device = driver.cuDeviceGet(0)
+    if err != driver.CUresult.CUDA_SUCCESS:
+        return None
+    attr = driver.CUdevice_attribute
+    _, major = driver.cuDeviceGetAttribute(attr.CU_DEVICE_ATTRIBUTE_COMPUTE_CAPABILITY_MAJOR, device)
+    _, minor = driver.cuDeviceGetAttribute(attr.CU_DEVICE_ATTRIBUTE_COMPUTE_CAPABILITY_MINOR, device)
+    return f"sm_{major}{minor}"
+
+
 # ============================================================================
 # Model Exporter
 # ============================================================================
@@ -638,38 +1251,110 @@ class ModelExporter:
     def __init__(self, config: AtomicExpertConfig):
         self.config = config
 
+    @staticmethod
+    def dump(obj: Dict[str, Any], path: Union[str, Path]) -> None:
+        """Write obj as indented JSON (orjson when available)"""
+        if orjson is not None:
+            Path(path).write_bytes(orjson.dumps(
+                obj,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            ))
+        else:
+            with open(path, "w") as f:
+                json.dump(obj, f, indent=2)
+
+    @staticmethod
+    def dump_plan(plan: Dict[str, Any], path: Union[str, Path],
+                  fmt: str = "json", compress: str = "none") -> None:
+        """Write a deployment plan as JSON or msgpack, optionally zstd-compressed"""
+        if fmt == "msgpack":
+            if msgpack is None:
+                raise RuntimeError("msgpack output requires the msgpack package")
+            data = msgpack.packb(plan, use_bin_type=True)
+        elif compress == "none":
+            ModelExporter.dump(plan, path)
+            return
+        elif orjson is not None:
+            data = orjson.dumps(plan, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        else:
+            data = json.dumps(plan, separators=(",", ":")).encode()
+
+        if compress == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstd compression requires the zstandard package")
+            data = zstandard.ZstdCompressor(level=3).compress(data)
+        Path(path).write_bytes(data)
+
+    @staticmethod
+    def load_plan(path: Union[str, Path]) -> Dict[str, Any]:
+        """Read a plan written by dump_plan; format is taken from the suffixes"""
+        path = Path(path)
+        data = path.read_bytes()
+        suffix = path.suffix
+        if suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError("zstd plans require the zstandard package")
+            data = zstandard.ZstdDecompressor().decompress(data)
+            suffix = Path(path.stem).suffix
+        if suffix == ".msgpack":
+            if msgpack is None:
+                raise RuntimeError("msgpack plans require the msgpack package")
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return _loads(data)
+
+    def _manifest_metadata(self) -> Dict[str, Any]:
+        return {
+            "format": "kuhul-atomic",
+            "version": "1.0",
+            "total_experts": self.config.total_experts,
+            "active_experts": self.config.active_experts,
+        }
+
+    @staticmethod
+    def _iter_tensor_offsets(experts: Iterable[ExpertTensor]) -> Iterator[Tuple[TensorSpec, int, int]]:
+        """Yield (spec, start, end) with cumulative offsets into one data blob"""
+        offset = 0
+        for expert in experts:
+            for spec in (expert.up_proj, expert.down_proj, expert.gate_proj):
+                if spec is None:
+                    continue
+                yield spec, offset, offset + spec.size_bytes
+                offset += spec.size_bytes
+
     def export_safetensors_manifest(self, experts: List[ExpertTensor]) -> Dict[str, Any]:
         """Generate safetensors manifest"""
         manifest = {
-            "__metadata__": {
-                "format": "kuhul-atomic",
-                "version": "1.0",
-                "total_experts": self.config.total_experts,
-                "active_experts": self.config.active_experts,
-            },
+            "__metadata__": self._manifest_metadata(),
             "tensors": {},
         }
 
-        for expert in experts:
-            manifest["tensors"][expert.up_proj.name] = {
-                "dtype": self.config.expert_precision.value,
-                "shape": list(expert.up_proj.shape),
-                "data_offsets": [0, expert.up_proj.size_bytes],
-            }
-            manifest["tensors"][expert.down_proj.name] = {
-                "dtype": self.config.expert_precision.value,
-                "shape": list(expert.down_proj.shape),
-                "data_offsets": [0, expert.down_proj.size_bytes],
+        dtype = self.config.expert_precision.value
+        for spec, start, end in self._iter_tensor_offsets(experts):
+            manifest["tensors"][spec.name] = {
+                "dtype": dtype,
+                "shape": list(spec.shape),
+                "data_offsets": [start, end],
             }
-            if expert.gate_proj:
-                manifest["tensors"][expert.gate_proj.name] = {
-                    "dtype": self.config.expert_precision.value,
-                    "shape": list(expert.gate_proj.shape),
-                    "data_offsets": [0, expert.gate_proj.size_bytes],
-                }
 
         return manifest
 
+    def write_safetensors_manifest(self, experts: Iterable[ExpertTensor], path: Union[str, Path]) -> None:
+        """Stream the safetensors manifest to path without building it in memory"""
+        dtype = json.dumps(self.config.expert_precision.value)
+        with open(path, "w") as f:
+            f.write('{"__metadata__":')
+            f.write(json.dumps(self._manifest_metadata(), separators=(",", ":")))
+            f.write(',"tensors":{')
+            sep = "\n"
+            for spec, start, end in self._iter_tensor_offsets(experts):
+                shape = ",".join(map(str, spec.shape))
+                f.write(
+                    f'{sep}{json.dumps(spec.name)}:{{"dtype":{dtype},"shape":[{shape}],'
+                    f'"data_offsets":[{start},{end}]}}'
+                )
+                sep = ",\n"
+            f.write("\n}}\n")
+
     def export_onnx_config(self) -> Dict[str, Any]:
         """Generate ONNX export configuration"""
         return {
@@ -702,6 +1387,20 @@ class ModelExporter:
 # CLI Interface
 # ============================================================================
 
+@lru_cache(maxsize=8)
+def _load_config(path_str: str, mtime_ns: int) -> Tuple[Dict[str, Any], AtomicExpertConfig]:
+    """Parse a runtime config; keyed on mtime so edits invalidate the entry"""
+    config = _loads(Path(path_str).read_bytes())
+    return config, AtomicExpertConfig.from_json(config)
+
+
+@lru_cache(maxsize=8)
+def _model_footprint(path_str: str, mtime_ns: int) -> Tuple[int, int]:
+    """(bytes per expert, router bytes) for the config at path_str"""
+    _, expert_config = _load_config(path_str, mtime_ns)
+    return ExpertBuilder(expert_config).size_only()
+
+
 def cmd_build(args):
     """Build model from config"""
     config_path = Path(args.config)
@@ -709,16 +1408,23 @@ def cmd_build(args):
         print(f"Error: Config file not found: {config_path}")
         return 1
 
-    with open(config_path) as f:
-        config = json.load(f)
-
-    expert_config = AtomicExpertConfig.from_json(config)
+    config, expert_config = _load_config(str(config_path), config_path.stat().st_mtime_ns)
     cluster_builder = ClusterBuilder(config, expert_config)
     plan = cluster_builder.generate_deployment_plan()
 
-    output_path = Path(args.output) if args.output else config_path.with_suffix(".plan.json")
-    with open(output_path, "w") as f:
-        json.dump(plan, f, indent=2)
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        suffix = ".plan.msgpack" if args.format == "msgpack" else ".plan.json"
+        if args.compress == "zstd":
+            suffix += ".zst"
+        output_path = config_path.with_suffix(suffix)
+
+    try:
+        ModelExporter.dump_plan(plan, output_path, args.format, args.compress)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
 
     print(f"Deployment plan generated: {output_path}")
     print(f"  Total experts: {expert_config.total_experts}")
@@ -742,7 +1448,9 @@ def cmd_quantize(args):
 
     # Generate dequantization kernel
     kernel_gen = GPUKernelGenerator()
-    kernel = kernel_gen.generate_dequant_kernel(precision)
+    kernel = cached_kernel(
+        f"dequant_{precision.value}", kernel_gen.generate_dequant_kernel, precision, np.dtype(args.storage)
+    )
 
     kernel_path = Path(args.output) if args.output else Path(f"dequant_{precision.value}.cu")
     with open(kernel_path, "w") as f:
@@ -759,29 +1467,73 @@ def cmd_kernels(args):
         print(f"Error: Config file not found: {config_path}")
         return 1
 
-    with open(config_path) as f:
-        config = json.load(f)
-
-    expert_config = AtomicExpertConfig.from_json(config)
+    config, expert_config = _load_config(str(config_path), config_path.stat().st_mtime_ns)
     kernel_gen = GPUKernelGenerator()
 
     output_dir = Path(args.output) if args.output else Path("kernels")
     output_dir.mkdir(exist_ok=True)
 
-    # Generate all kernels
-    kernels = {
-        "dequant_int4.cu": kernel_gen.generate_dequant_kernel(Precision.INT4),
-        "dequant_int8.cu": kernel_gen.generate_dequant_kernel(Precision.INT8),
-        "dequant_int2.cu": kernel_gen.generate_dequant_kernel(Precision.INT2),
-        "expert_forward.cu": kernel_gen.generate_expert_forward(expert_config),
-        "router_topk.cu": kernel_gen.generate_router_kernel(expert_config),
+    # Kernel sources are only generated for the names selected below
+    precision = expert_config.expert_precision
+    generators: Dict[str, Callable[[], str]] = {
+        "dequant_int4": lambda: cached_kernel(
+            "dequant_int4", kernel_gen.generate_dequant_kernel, Precision.INT4),
+        "dequant_int8": lambda: cached_kernel(
+            "dequant_int8", kernel_gen.generate_dequant_kernel, Precision.INT8),
+        "dequant_int2": lambda: cached_kernel(
+            "dequant_int2", kernel_gen.generate_dequant_kernel, Precision.INT2),
+        "fused_dequant_gemm_int4": lambda: cached_kernel(
+            "fused_dequant_gemm_int4", kernel_gen.generate_fused_dequant_gemm, Precision.INT4),
+        "expert_forward": lambda: cached_kernel(
+            "expert_forward", kernel_gen.generate_expert_forward,
+            expert_config, precision == Precision.FP16),
+        "router_topk": lambda: cached_kernel(
+            "router_topk", kernel_gen.generate_router_kernel, expert_config),
     }
 
-    for filename, content in kernels.items():
+    if args.only:
+        selected = args.only
+    elif precision == Precision.INT4:
+        # INT4 experts dequantize inside the GEMM instead of via an FP32 buffer
+        selected = ["fused_dequant_gemm_int4", "router_topk"]
+    elif precision in (Precision.INT8, Precision.INT2):
+        selected = [f"dequant_{precision.value}", "expert_forward", "router_topk"]
+    else:
+        selected = ["expert_forward", "router_topk"]
+
+    kernels: List[str] = []
+    for name in selected:
+        filename = f"{name}.cu"
         with open(output_dir / filename, "w") as f:
-            f.write(content)
+            f.write(generators[name]())
+        kernels.append(filename)
         print(f"Generated: {output_dir / filename}")
 
+    if args.no_ptx:
+        return 0
+    if not PTXCompiler.available():
+        print("Skipping PTX: NVRTC not available (pip install cuda-python)")
+        return 0
+    arch = args.arch or detect_arch(config)
+    if not arch:
+        print("Skipping PTX: no --arch given and no target GPU found")
+        return 0
+
+    # NVRTC needs no CUDA context, so every kernel can compile at once
+    compiler = PTXCompiler(arch)
+    try:
+        results = compiler.compile_files([output_dir / filename for filename in kernels])
+    except RuntimeError as e:
+        missing = _MISSING_HEADER_RE.search(str(e))
+        if missing:
+            print(f"Skipping PTX: CUDA header {missing.group(1)} not found "
+                  f"(set CUDA_HOME or pip install nvidia-cuda-runtime-cu12)")
+            return 0
+        print(f"Error: {e}")
+        return 1
+    for ptx_path, compiled in results:
+        print(f"{'Compiled' if compiled else 'Up to date'}: {ptx_path} ({compiler.arch})")
+
     return 0
 
 
@@ -792,28 +1544,23 @@ def cmd_export(args):
         print(f"Error: Config file not found: {config_path}")
         return 1
 
-    with open(config_path) as f:
-        config = json.load(f)
-
-    expert_config = AtomicExpertConfig.from_json(config)
+    config, expert_config = _load_config(str(config_path), config_path.stat().st_mtime_ns)
     exporter = ModelExporter(expert_config)
 
     format_type = args.format.lower()
     output_path = Path(args.output) if args.output else Path(f"export_{format_type}.json")
 
     if format_type == "onnx":
-        manifest = exporter.export_onnx_config()
+        exporter.dump(exporter.export_onnx_config(), output_path)
     elif format_type == "safetensors":
         expert_builder = ExpertBuilder(expert_config)
-        experts = expert_builder.build_all_experts([f"expert-{i}" for i in range(expert_config.total_experts)])
-        manifest = exporter.export_safetensors_manifest(experts)
+        # Specs are pure metadata, so stream them rather than holding every expert
+        experts = expert_builder.iter_experts(f"expert-{i}" for i in range(expert_config.total_experts))
+        exporter.write_safetensors_manifest(experts, output_path)
     else:
         print(f"Unknown format: {format_type}")
         return 1
 
-    with open(output_path, "w") as f:
-        json.dump(manifest, f, indent=2)
-
     print(f"Exported {format_type} config: {output_path}")
     return 0
 
@@ -825,11 +1572,7 @@ def cmd_info(args):
         print(f"Error: Config file not found: {config_path}")
         return 1
 
-    with open(config_path) as f:
-        config = json.load(f)
-
-    expert_config = AtomicExpertConfig.from_json(config)
-    expert_builder = ExpertBuilder(expert_config)
+    config, expert_config = _load_config(str(config_path), config_path.stat().st_mtime_ns)
 
     print("\n K'UHUL Atomic Expert Model Info")
     print("=" * 50)
@@ -846,14 +1589,11 @@ def cmd_info(args):
     print()
 
     # Calculate total size
-    expert = expert_builder.build_expert("sample")
-    router = expert_builder.build_router()
-
-    expert_size = expert.total_bytes * expert_config.total_experts
-    router_size = router.size_bytes
+    expert_bytes, router_size = _model_footprint(str(config_path), config_path.stat().st_mtime_ns)
+    expert_size = expert_bytes * expert_config.total_experts
 
     print("Memory Footprint:")
-    print(f"  Per Expert:        {expert.total_bytes / 1024:.2f} KB")
+    print(f"  Per Expert:        {expert_bytes / 1024:.2f} KB")
     print(f"  All Experts:       {expert_size / (1024*1024):.2f} MB")
     print(f"  Router:            {router_size / 1024:.2f} KB")
     print(f"  Total:             {(expert_size + router_size) / (1024*1024):.2f} MB")
@@ -872,18 +1612,31 @@ def main():
     build_parser = subparsers.add_parser("build", help="Build deployment plan from config")
     build_parser.add_argument("--config", "-c", required=True, help="Runtime config JSON")
     build_parser.add_argument("--output", "-o", help="Output plan file")
+    build_parser.add_argument("--format", "-f", default="json", choices=["json", "msgpack"],
+                              help="Plan encoding")
+    build_parser.add_argument("--compress", default="none", choices=["none", "zstd"],
+                              help="Compress the plan file")
 
     # Quantize command
     quant_parser = subparsers.add_parser("quantize", help="Generate quantization kernels")
     quant_parser.add_argument("--precision", "-p", default="int4",
                               choices=["int2", "int4", "int8", "fp16"],
                               help="Target precision")
+    quant_parser.add_argument("--storage", "-s", default="uint8",
+                              choices=["uint8", "uint16", "uint32"],
+                              help="Storage word for packed INT4 weights")
     quant_parser.add_argument("--output", "-o", help="Output kernel file")
 
     # Kernels command
     kernel_parser = subparsers.add_parser("kernels", help="Generate all GPU kernels")
     kernel_parser.add_argument("--config", "-c", required=True, help="Runtime config JSON")
     kernel_parser.add_argument("--output", "-o", help="Output directory")
+    kernel_parser.add_argument("--only", nargs="+",
+                               choices=["dequant_int4", "dequant_int8", "dequant_int2",
+                                        "fused_dequant_gemm_int4", "expert_forward", "router_topk"],
+                               help="Kernels to generate (default: those the expert precision uses)")
+    kernel_parser.add_argument("--arch", "-a", help="PTX target, e.g. sm_80 (default: config/GPU)")
+    kernel_parser.add_argument("--no-ptx", action="store_true", help="Only write .cu sources")
 
     # Export command
     export_parser = subparsers.add_parser("export", help="Export model configuration")
@@ -6,38 +6,171 @@ be memory-mapped and streamed without parsing in hot loops.
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import multiprocessing
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Iterable, List
+from typing import BinaryIO, Dict, Iterable, List, Optional
 
 import numpy as np
 
+try:  # Optional: batched reads via io_uring (Linux only)
+    import liburing
+except ImportError:
+    liburing = None
+
+try:  # Optional: fast atom hashing for --dedupe
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:  # Optional: JIT-compiled tokenizer kernel for non-ASCII text
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # ---- CONFIG ----
 VOCAB_SIZE = 65_536  # uint16
 DTYPE = np.uint16
 ATOM_SIZE = 256  # tokens per atom
 OUT_FILE = "matrix_atoms.bin"
+NARROW_DTYPE = np.uint8  # --auto-dtype output when every token fits a byte
+REWRITE_CHUNK = 1 << 24  # tokens per chunk when narrowing the output file
+INDEX_DTYPE = np.uint32  # atom ids in the --dedupe index file
+CACHE_DIR = ".atomic_cache"  # per-file token cache
+TOKENIZER_VERSION = "v2"  # bump when cleaning/tokenizing output changes
+READ_BATCH = 64  # files read (and tokenized) per worker task
+IO_URING_DEPTH = 256  # max reads in flight per io_uring submission
+NUMBA_MIN_CODEPOINTS = 1 << 16  # below this, NumPy beats JIT dispatch overhead
 
 # ---- PLACEHOLDERS (plug your real ones in) ----
 
-def load_and_clean(path: Path) -> str:
-    text = path.read_text(encoding="utf-8", errors="ignore")
+# Minimal HTML stripping (replace later if needed): each tag becomes a space.
+# Runs on the raw UTF-8 bytes; '<' and '>' never occur inside a multi-byte char.
+_TAG_RE = re.compile(rb"<[^>]*>")
+_JSON_WHITESPACE = (b" ", b"\n", b"\t", b"\r")
+
+
+def _decode(raw: bytes) -> str:
+    text = raw.decode("utf-8", errors="ignore")
+    if "\r" in text:  # universal newlines, as read_text() would give
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
 
-    if path.suffix == ".json":
+def load_and_clean(path: Path, raw: Optional[bytes] = None) -> str:
+    if raw is None:
+        raw = path.read_bytes()
+
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        text = _decode(raw)
+        if not any(ws in raw for ws in _JSON_WHITESPACE):
+            # Already compact: a parse/serialize round-trip would not shrink it
+            return text
         try:
             obj = json.loads(text)
             text = json.dumps(obj, separators=(",", ":"))
         except json.JSONDecodeError:
             pass
+        return text
 
-    # Minimal HTML stripping (replace later if needed)
-    text = text.replace("<", " ").replace(">", " ")
-    return text
+    if suffix == ".html":
+        raw = _TAG_RE.sub(b" ", raw)
+    return _decode(raw)
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _tok_kernel(codes, out, mask):
+        for i in prange(codes.size):
+            out[i] = codes[i] & mask
+else:
+    _tok_kernel = None
+
+
+def pi_tokenize(text: str) -> np.ndarray:
+    """Deterministic placeholder tokenizer (replace with π tokenizer).
 
+    Maps each code point to ``ord(char) % VOCAB_SIZE`` as a vectorized pass.
+    """
+    if text.isascii():
+        codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        return codes.astype(DTYPE)
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    if _tok_kernel is not None and codes.size >= NUMBA_MIN_CODEPOINTS:
+        out = np.empty(codes.size, dtype=DTYPE)
+        _tok_kernel(codes, out, np.uint32(VOCAB_SIZE - 1))
+        return out
+    return (codes & (VOCAB_SIZE - 1)).astype(DTYPE)
 
-def pi_tokenize(text: str) -> List[int]:
-    """Deterministic placeholder tokenizer (replace with π tokenizer)."""
-    return [ord(char) % VOCAB_SIZE for char in text]
+
+# ---- READERS ----
+
+def _read_files_uring(paths: List[str]) -> List[bytes]:
+    """Read whole files with batched io_uring submissions."""
+    results = [b""] * len(paths)
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    liburing.io_uring_queue_init(min(IO_URING_DEPTH, len(paths)), ring)
+    try:
+        for start in range(0, len(paths), IO_URING_DEPTH):
+            window = paths[start:start + IO_URING_DEPTH]
+            fds: List[int] = []
+            bufs: List[bytearray] = []
+            try:
+                pending = 0
+                for i, path in enumerate(window):
+                    fd = os.open(path, os.O_RDONLY)
+                    fds.append(fd)
+                    bufs.append(bytearray(os.fstat(fd).st_size))
+                    if not bufs[i]:
+                        continue
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_read(sqe, fd, bufs[i], 0)
+                    liburing.io_uring_sqe_set_data64(sqe, i)
+                    pending += 1
+                if pending:
+                    liburing.io_uring_submit(ring)
+
+                for _ in range(pending):
+                    liburing.io_uring_wait_cqe(ring, cqe)
+                    entry = cqe[0]
+                    i, res = liburing.io_uring_cqe_get_data64(entry), entry.res
+                    liburing.io_uring_cqe_seen(ring, entry)
+                    if res < 0:
+                        raise OSError(-res, os.strerror(-res), window[i])
+                    # Finish short reads synchronously
+                    while res < len(bufs[i]):
+                        chunk = os.pread(fds[i], len(bufs[i]) - res, res)
+                        if not chunk:
+                            del bufs[i][res:]
+                            break
+                        bufs[i][res:res + len(chunk)] = chunk
+                        res += len(chunk)
+                    results[start + i] = bytes(bufs[i])
+            finally:
+                for fd in fds:
+                    os.close(fd)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    return results
+
+
+def read_files(paths: List[str]) -> List[bytes]:
+    """Read whole files, using io_uring when available."""
+    if liburing is not None and paths:
+        try:
+            return _read_files_uring(paths)
+        except OSError:
+            pass  # e.g. io_uring disabled in this kernel/sandbox
+    return [Path(path).read_bytes() for path in paths]
 
 
 # ---- PACKER ----
@@ -48,25 +181,238 @@ def iter_text_files(input_dir: Path) -> Iterable[Path]:
             yield path
 
 
-def pack_directory(input_dir: str, out_file: str) -> None:
-    tokens: List[int] = []
+def _cache_key(path_str: str, st: os.stat_result) -> str:
+    ident = f"{os.path.abspath(path_str)}:{st.st_size}:{st.st_mtime_ns}:{TOKENIZER_VERSION}"
+    return hashlib.sha256(ident.encode()).hexdigest()
+
+
+def _tokenize_batch(path_strs: List[str], cache_dir: Optional[str] = None) -> List[np.ndarray]:
+    """Worker entry point: read, clean and tokenize a batch of files.
+
+    With ``cache_dir`` set, token arrays are reused from (and stored to)
+    ``<cache_dir>/<key>.bin`` keyed on path, size, mtime and tokenizer version.
+    """
+    results: List[Optional[np.ndarray]] = [None] * len(path_strs)
+    cache_files: List[Optional[Path]] = [None] * len(path_strs)
+
+    if cache_dir is not None:
+        for i, path_str in enumerate(path_strs):
+            cache_file = Path(cache_dir) / f"{_cache_key(path_str, os.stat(path_str))}.bin"
+            if cache_file.exists():
+                results[i] = np.fromfile(cache_file, dtype=DTYPE)
+            else:
+                cache_files[i] = cache_file
+
+    misses = [i for i, arr in enumerate(results) if arr is None]
+    blobs = read_files([path_strs[i] for i in misses])
+    for i, raw in zip(misses, blobs):
+        arr = pi_tokenize(load_and_clean(Path(path_strs[i]), raw))
+        results[i] = arr
+        if cache_files[i] is not None:
+            # Write-then-rename so concurrent runs never see a partial entry
+            tmp = cache_files[i].with_suffix(f".{os.getpid()}.tmp")
+            arr.tofile(tmp)
+            os.replace(tmp, cache_files[i])
+
+    return results
+
+
+class MemmapWriter:
+    """Fill a preallocated token memmap in place, then trim it to size.
+
+    ``capacity`` is an estimate; JSON re-escaping can emit more tokens than
+    source bytes, so the mapping grows (doubling) if the estimate falls short.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.cursor = 0
+        self._map(max(capacity, ATOM_SIZE), "w+")
+
+    def _map(self, capacity: int, mode: str) -> None:
+        self.capacity = capacity
+        self.mm = np.memmap(self.path, dtype=DTYPE, mode=mode, shape=(capacity,))
+
+    def write(self, arr: np.ndarray) -> None:
+        end = self.cursor + arr.size
+        if end > self.capacity:
+            self.mm.flush()
+            del self.mm
+            self._map(max(end, 2 * self.capacity), "r+")
+        self.mm[self.cursor:end] = arr
+        self.cursor = end
+
+    def close(self) -> None:
+        self.mm.flush()
+        del self.mm
+        os.truncate(self.path, self.cursor * np.dtype(DTYPE).itemsize)
+
+
+def _atom_digest(atom: bytes) -> bytes:
+    if xxhash is not None:
+        return xxhash.xxh3_128_digest(atom)
+    return hashlib.blake2b(atom, digest_size=16).digest()
+
+
+class AtomDeduper:
+    """Write each distinct atom once and record an index of atom ids.
+
+    Tokens may arrive in any chunking; they are regrouped into ``ATOM_SIZE``
+    rows so atoms spanning file boundaries hash the same as a serial pack.
+    """
+
+    def __init__(self, atoms_out: MemmapWriter, index_fh: BinaryIO):
+        self.atoms_out = atoms_out
+        self.index_fh = index_fh
+        self.seen: Dict[bytes, int] = {}
+        self.total_atoms = 0
+        self._carry = np.empty(0, dtype=DTYPE)
+
+    def write(self, arr: np.ndarray) -> None:
+        if self._carry.size:
+            arr = np.concatenate([self._carry, arr])
+        full = arr.size - arr.size % ATOM_SIZE
+        self._carry = arr[full:].copy()
+        if not full:
+            return
+
+        rows = arr[:full].reshape(-1, ATOM_SIZE)
+        ids = np.empty(len(rows), dtype=INDEX_DTYPE)
+        for i, row in enumerate(rows):
+            key = _atom_digest(row.tobytes())
+            atom_id = self.seen.get(key)
+            if atom_id is None:
+                atom_id = self.seen[key] = len(self.seen)
+                self.atoms_out.write(row)
+            ids[i] = atom_id
+        ids.tofile(self.index_fh)
+        self.total_atoms += len(rows)
+
+    def close(self) -> None:
+        """Zero-pad and flush the final partial atom."""
+        if self._carry.size:
+            self.write(np.zeros(ATOM_SIZE - self._carry.size, dtype=DTYPE))
+
+    @property
+    def unique_atoms(self) -> int:
+        return len(self.seen)
+
+
+def _narrow_file(path: str, dtype: np.dtype) -> None:
+    """Rewrite a DTYPE token file in place as the narrower ``dtype``."""
+    src = np.memmap(path, dtype=DTYPE, mode="r")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        for start in range(0, src.size, REWRITE_CHUNK):
+            src[start:start + REWRITE_CHUNK].astype(dtype).tofile(fh)
+    del src
+    os.replace(tmp, path)
+
+
+def pack_directory(
+    input_dir: str,
+    out_file: str,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = CACHE_DIR,
+    invalidate: bool = False,
+    dedupe: bool = False,
+    auto_dtype: bool = False,
+) -> None:
     root = Path(input_dir)
+    paths = [str(path) for path in iter_text_files(root)]
+    total_tokens = 0
+    max_token = 0
+
+    if cache_dir is not None:
+        if invalidate:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    # spawn, not fork: forking after JIT worker threads have started can deadlock
+    ctx = multiprocessing.get_context("spawn")
+    index_file = Path(out_file).with_suffix(".index.bin")
+    # Cleaned text never has more code points than source bytes (barring JSON
+    # re-escaping, which MemmapWriter absorbs), so this bounds the token count.
+    capacity = sum(os.stat(path).st_size for path in paths) + ATOM_SIZE
+    out = MemmapWriter(out_file, capacity)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        index_fh = open(index_file, "wb") if dedupe else None
+        deduper = AtomDeduper(out, index_fh) if dedupe else None
+        try:
+            batches = [paths[i:i + READ_BATCH] for i in range(0, len(paths), READ_BATCH)]
+            tokenize = partial(_tokenize_batch, cache_dir=cache_dir)
+            # map() preserves input order, so output is identical to a serial run
+            for arrays in pool.map(tokenize, batches):
+                for arr in arrays:
+                    if deduper is not None:
+                        deduper.write(arr)
+                    else:
+                        out.write(arr)
+                    total_tokens += arr.size
+                    if auto_dtype and arr.size:
+                        max_token = max(max_token, int(arr.max()))
+
+            pad = (-total_tokens) % ATOM_SIZE
+            if deduper is not None:
+                deduper.close()
+            elif pad:
+                out.write(np.zeros(pad, dtype=DTYPE))
+            total_tokens += pad
+        finally:
+            out.close()
+            if index_fh is not None:
+                index_fh.close()
+
+    dtype = np.dtype(DTYPE)
+    # An empty output has nothing to rewrite (and cannot be memory-mapped)
+    if auto_dtype and total_tokens and max_token <= np.iinfo(NARROW_DTYPE).max:
+        dtype = np.dtype(NARROW_DTYPE)
+        _narrow_file(out_file, dtype)
+
+    # Sidecar so consumers can memmap the atoms without guessing the layout
+    meta = {
+        "dtype": dtype.name,
+        "vocab_size": VOCAB_SIZE if dtype == DTYPE else np.iinfo(dtype).max + 1,
+        "atom_size": ATOM_SIZE,
+        "tokenizer_version": TOKENIZER_VERSION,
+    }
+    if dedupe:
+        meta["index"] = index_file.name
+        meta["index_dtype"] = np.dtype(INDEX_DTYPE).name
+    Path(out_file).with_suffix(".meta.json").write_text(json.dumps(meta, indent=2))
 
-    for path in iter_text_files(root):
-        text = load_and_clean(path)
-        tokens.extend(pi_tokenize(text))
+    print(f"[OK] Packed {total_tokens} tokens")
+    print(f"[OK] Atoms: {total_tokens // ATOM_SIZE}")
+    if deduper is not None:
+        print(f"[OK] Unique atoms: {deduper.unique_atoms}")
+        print(f"[OK] Index: {index_file}")
+    print(f"[OK] Output: {out_file} ({dtype.name})")
 
-    pad = (-len(tokens)) % ATOM_SIZE
-    if pad:
-        tokens.extend([0] * pad)
 
-    arr = np.array(tokens, dtype=DTYPE)
-    arr.tofile(out_file)
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pack text sources into MATRIX binary atoms")
+    parser.add_argument("input_dir", nargs="?", default="datasets", help="Directory to scan")
+    parser.add_argument("--output", "-o", default=OUT_FILE, help="Output binary file")
+    parser.add_argument("--workers", "-j", type=int, help="Tokenizer processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Token cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the token cache")
+    parser.add_argument("--invalidate", action="store_true", help="Clear the token cache first")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Store identical atoms once and write a uint32 atom index")
+    parser.add_argument("--auto-dtype", action="store_true",
+                        help="Write uint8 tokens when every token fits in a byte")
+    args = parser.parse_args()
 
-    print(f"[OK] Packed {len(arr)} tokens")
-    print(f"[OK] Atoms: {len(arr) // ATOM_SIZE}")
-    print(f"[OK] Output: {out_file}")
+    pack_directory(
+        args.input_dir,
+        args.output,
+        workers=args.workers,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        invalidate=args.invalidate,
+        dedupe=args.dedupe,
+        auto_dtype=args.auto_dtype,
+    )
 
 
 if __name__ == "__main__":
-    pack_directory("datasets", OUT_FILE)
+    main()
@@ -16,16 +16,38 @@ ARCHITECTURE:
 └─────────┴─────────┴─────────┴──────────────────┘
 """
 import os
+import re
 import argparse
+import asyncio
 import threading
 import webbrowser
 import time
 import pathlib
-import socketserver
 import http.server
 import json
+import locale
+import sys
+import datetime
 import subprocess
-from typing import Optional, Any
+import functools
+import atexit
+import queue
+import shutil
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, List, Tuple, Union
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # Only needed for OllamaCloud
+    requests = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # Optional: faster stream parsing
+    _loads = json.loads
 
 def parse_args():
     parser = argparse.ArgumentParser(description="MX2LM CLI with optional Basher V5 web UI")
@@ -36,12 +58,27 @@ def parse_args():
     parser.add_argument('--raw-ps', action='store_true', help='Enable raw PowerShell mode (bypass DSL)')
     return parser.parse_args()
 
+class WebHandler(http.server.SimpleHTTPRequestHandler):
+    """Static handler with the web UI's mimetypes resolved up front"""
+    extensions_map = {
+        **http.server.SimpleHTTPRequestHandler.extensions_map,
+        '.html': 'text/html',
+        '.css': 'text/css',
+        '.js': 'text/javascript',
+        '.mjs': 'text/javascript',
+        '.json': 'application/json',
+        '.svg': 'image/svg+xml',
+        '.png': 'image/png',
+        '.ico': 'image/x-icon',
+        '.wasm': 'application/wasm',
+    }
+
 def start_web_server(port: int, open_browser: bool):
-    """Start a simple HTTP server serving the ./web directory."""
+    """Start a threaded HTTP server serving the ./web directory."""
     web_root = pathlib.Path(__file__).with_name('web').resolve()
-    os.chdir(web_root)
-    handler = http.server.SimpleHTTPRequestHandler
-    httpd = socketserver.TCPServer(("127.0.0.1", port), handler)
+    handler = functools.partial(WebHandler, directory=str(web_root))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    httpd.daemon_threads = True
     thread = threading.Thread(target=httpd.serve_forever, daemon=True, name="BasherWebServer")
     thread.start()
     if open_browser:
@@ -56,13 +93,22 @@ def start_web_server(port: int, open_browser: bool):
 # HYBRID AGENT ROUTER - Sub-CLI Dispatcher
 # ═══════════════════════════════════════════════════════════════
 
+@functools.lru_cache(maxsize=None)
+def _env(key: str) -> Optional[str]:
+    """Environment lookup, cached: the CLI never changes its own env"""
+    return os.environ.get(key)
+
+
+MAX_PARALLEL_AGENTS = 4   # Concurrent non-interactive agent subprocesses
+AGENT_TIMEOUT = 120       # Seconds before a non-interactive agent is killed
+
 class AgentRouter:
     """
     Routes /command prefixes to dedicated CLI sub-terminals.
     Each agent has its own interactive mode when spawned.
     """
 
-    AGENT_REGISTRY = {
+    AGENT_REGISTRY = MappingProxyType({
         '/claude': {
             'name': 'Claude Code',
             'package': '@anthropic-ai/claude-code',
@@ -105,16 +151,24 @@ class AgentRouter:
             'env_key': 'POSTHOG_API_KEY',
             'description': 'PostHog unified code agent framework'
         }
-    }
+    })
 
     @classmethod
     def parse_command(cls, input_str: str) -> tuple:
         """Parse input for /agent prefix"""
         input_str = input_str.strip()
-        for prefix, config in cls.AGENT_REGISTRY.items():
-            if input_str.startswith(prefix):
-                remaining = input_str[len(prefix):].strip()
-                return prefix, config, remaining
+        parts = input_str.split(None, 1)
+        head = parts[0] if parts else ''
+        config = cls.AGENT_REGISTRY.get(head)
+        if config:
+            return head, config, parts[1] if len(parts) > 1 else ''
+
+        # Prefix glued to its argument (e.g. "/claude:fix"): longest prefix wins
+        if head.startswith('/'):
+            for prefix in sorted(cls.AGENT_REGISTRY, key=len, reverse=True):
+                if input_str.startswith(prefix):
+                    remaining = input_str[len(prefix):].strip()
+                    return prefix, cls.AGENT_REGISTRY[prefix], remaining
         return None, None, input_str
 
     @classmethod
@@ -125,7 +179,7 @@ class AgentRouter:
             print(f"[MX2LM] Unknown agent: {prefix}")
             return False
 
-        if config['env_key'] and not os.getenv(config['env_key']):
+        if config['env_key'] and not _env(config['env_key']):
             print(f"[MX2LM] ⚠️  Missing env: {config['env_key']}")
             print(f"[MX2LM] Set it with: export {config['env_key']}=your_key")
             return False
@@ -146,20 +200,60 @@ class AgentRouter:
             if interactive:
                 subprocess.run(cmd, shell=True, env=os.environ.copy())
             else:
-                result = subprocess.run(
-                    cmd, shell=True, capture_output=True, text=True,
-                    env=os.environ.copy(), timeout=120
-                )
-                return result.stdout
+                result = cls.spawn_agents_parallel([(prefix, args)])[0]
+                if isinstance(result, BaseException):
+                    raise result
+                return result
         except KeyboardInterrupt:
             print(f"\n[MX2LM] Returning to main CLI...")
-        except subprocess.TimeoutExpired:
-            print(f"[MX2LM] Agent timeout (120s)")
+        except asyncio.TimeoutError:
+            print(f"[MX2LM] Agent timeout ({AGENT_TIMEOUT}s)")
         except Exception as e:
             print(f"[MX2LM] Agent error: {e}")
 
         return True
 
+    @classmethod
+    async def _spawn_one(cls, prefix: str, args: str, sem: asyncio.Semaphore):
+        """Run one agent non-interactively and return its stdout."""
+        config = cls.AGENT_REGISTRY.get(prefix)
+        if not config:
+            print(f"[MX2LM] Unknown agent: {prefix}")
+            return False
+
+        if config['env_key'] and not _env(config['env_key']):
+            print(f"[MX2LM] ⚠️  Missing env: {config['env_key']}")
+            return False
+
+        cmd = f"{config['cmd']} {args}" if args else config['cmd']
+        async with sem:
+            proc = await asyncio.create_subprocess_shell(
+                cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                env=os.environ.copy()
+            )
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=AGENT_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
+        return stdout.decode('utf-8', 'replace')
+
+    @classmethod
+    def spawn_agents_parallel(cls, jobs: List[Tuple[str, str]]) -> list:
+        """
+        Run (prefix, args) jobs concurrently, at most MAX_PARALLEL_AGENTS at once.
+        Returns one entry per job, in order: stdout, False if the agent could not
+        start, or the exception it raised.
+        """
+        async def gather():
+            sem = asyncio.Semaphore(MAX_PARALLEL_AGENTS)
+            return await asyncio.gather(
+                *(cls._spawn_one(prefix, args, sem) for prefix, args in jobs),
+                return_exceptions=True
+            )
+        return asyncio.run(gather())
+
     @classmethod
     def list_agents(cls):
         """List all available agent sub-commands"""
@@ -167,17 +261,30 @@ class AgentRouter:
         print("║               MX2LM Available Agent Sub-CLIs                  ║")
         print("╠═══════════════════════════════════════════════════════════════╣")
         for prefix, config in cls.AGENT_REGISTRY.items():
-            status = "✓" if not config['env_key'] or os.getenv(config['env_key']) else "○"
+            status = "✓" if AGENT_HAS_ENV.get(prefix) else "○"
             print(f"║  {status} {prefix:<10} │ {config['name']:<15} │ {config['package']:<20}║")
         print("╚═══════════════════════════════════════════════════════════════╝")
         print("\nUsage: /claude [prompt]  or  /gemini  or  /codex chat 'question'")
         print("       Type just the prefix (e.g., /claude) to enter interactive mode\n")
 
 
+# Whether each agent's API key is present, resolved once at import
+AGENT_HAS_ENV = {
+    prefix: not config['env_key'] or bool(_env(config['env_key']))
+    for prefix, config in AgentRouter.AGENT_REGISTRY.items()
+}
+
+
 # ═══════════════════════════════════════════════════════════════
 # @posthog/code-agent CORE INTEGRATION
 # ═══════════════════════════════════════════════════════════════
 
+# Auto-routing keywords; matched as substrings, so "debugging" counts as "debug"
+_CODE_KW = frozenset({'code', 'function', 'debug', 'refactor'})
+_VISION_KW = frozenset({'image', 'vision', 'describe', 'analyze'})
+_CODE_KW_RE = re.compile('|'.join(sorted(_CODE_KW)))
+_VISION_KW_RE = re.compile('|'.join(sorted(_VISION_KW)))
+
 class PostHogCodeAgent:
     """
     Core agent framework wrapper - all sub-CLIs can be orchestrated through this.
@@ -193,22 +300,38 @@ class PostHogCodeAgent:
         """Set shared context accessible by all sub-agents"""
         self.context[key] = value
 
-    def run(self, prompt: str, agent: str = 'auto'):
-        """Run a prompt through the selected agent or auto-detect."""
+    def run(self, prompt: Union[str, List[str]], agent: str = 'auto'):
+        """
+        Run a prompt through the selected agent or auto-detect.
+        A list of prompts is dispatched concurrently; results keep prompt order.
+        """
+        if not isinstance(prompt, str):
+            return AgentRouter.spawn_agents_parallel([self._route(p, agent) for p in prompt])
+
         prefix, config, remaining = AgentRouter.parse_command(prompt)
 
         if prefix:
             return AgentRouter.spawn_agent(prefix, remaining, interactive=False)
 
+        return self._run_with_agent(*self._route(prompt, agent))
+
+    def _route(self, prompt: str, agent: str = 'auto') -> Tuple[str, str]:
+        """Pick (prefix, args) for a prompt: explicit /prefix, keywords, or agent"""
+        prefix, config, remaining = AgentRouter.parse_command(prompt)
+
+        if prefix:
+            return prefix, remaining
+
         if agent == 'auto':
-            if any(kw in prompt.lower() for kw in ['code', 'function', 'debug', 'refactor']):
-                return self._run_with_agent('/claude', prompt)
-            elif any(kw in prompt.lower() for kw in ['image', 'vision', 'describe', 'analyze']):
-                return self._run_with_agent('/gemini', prompt)
+            lowered = prompt.lower()
+            if _CODE_KW_RE.search(lowered):
+                return '/claude', prompt
+            elif _VISION_KW_RE.search(lowered):
+                return '/gemini', prompt
             else:
-                return self._run_with_agent('/codex', prompt)
+                return '/codex', prompt
 
-        return self._run_with_agent(f'/{agent}', prompt)
+        return f'/{agent}', prompt
 
     def _run_with_agent(self, prefix: str, prompt: str):
         """Internal agent execution"""
@@ -220,6 +343,8 @@ class PostHogCodeAgent:
 # OLLAMA CLOUD API - Remote Model Access
 # ═══════════════════════════════════════════════════════════════
 
+STREAM_FLUSH_EVERY = 16  # Streamed tokens between stdout flushes
+
 OLLAMA_CLOUD_MODELS = [
     'gpt-oss:120b', 'gpt-oss:120b-cloud', 'llama3.3:70b',
     'qwen3:235b', 'deepseek-r1:671b', 'gemma3:27b'
@@ -229,50 +354,58 @@ class OllamaCloud:
     """Ollama Cloud API client for remote model inference"""
 
     def __init__(self, api_key=None, host="https://ollama.com"):
+        if requests is None:
+            raise ImportError("OllamaCloud requires the requests package (pip install requests)")
         self.host = host
-        self.api_key = api_key or os.getenv("OLLAMA_API_KEY", "")
+        self.api_key = api_key or _env("OLLAMA_API_KEY") or ""
         self.headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
 
+        # One keep-alive session so repeated calls reuse the TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
     def list_models(self):
         """List available cloud models"""
-        import requests
-        response = requests.get(f"{self.host}/api/tags", headers=self.headers)
+        response = self.session.get(f"{self.host}/api/tags")
         return response.json() if response.ok else None
 
     def chat(self, prompt, model="gpt-oss:120b", stream=True):
         """Chat with a cloud model"""
-        import requests
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "stream": stream
         }
-        response = requests.post(
+        response = self.session.post(
             f"{self.host}/api/chat",
             json=payload,
-            headers=self.headers,
             stream=stream
         )
         if stream:
-            result = ""
-            for line in response.iter_lines():
+            parts = []
+            pending = 0
+            for line in response.iter_lines(chunk_size=8192):
                 if line:
-                    chunk = json.loads(line)
+                    chunk = _loads(line)
                     if 'message' in chunk:
-                        result += chunk['message'].get('content', '')
-                        print(chunk['message'].get('content', ''), end='', flush=True)
-            return result
+                        content = chunk['message'].get('content', '')
+                        parts.append(content)
+                        sys.stdout.write(content)
+                        pending += 1
+                        if pending >= STREAM_FLUSH_EVERY or '\n' in content:
+                            sys.stdout.flush()
+                            pending = 0
+            sys.stdout.flush()
+            return ''.join(parts)
         return response.json()
 
     def generate(self, prompt, model="gpt-oss:120b"):
         """Generate completion (non-chat)"""
-        import requests
         payload = {"model": model, "prompt": prompt}
-        response = requests.post(
-            f"{self.host}/api/generate",
-            json=payload,
-            headers=self.headers
-        )
+        response = self.session.post(f"{self.host}/api/generate", json=payload)
         return response.json()
 
 
@@ -317,20 +450,36 @@ PS_COMMAND_REGISTRY = {
     ]
 }
 
-PS_ILLEGAL_CHARS = r'[|;`\$(){}[\]\\]'
+# Read-only views: the precomputed _ALLOW/_DENY/AGENT_HAS_ENV indexes assume
+# the registries never change, and helpers may read them from worker threads
+PS_COMMAND_REGISTRY = MappingProxyType({
+    'allow': MappingProxyType(PS_COMMAND_REGISTRY['allow']),
+    'deny': frozenset(PS_COMMAND_REGISTRY['deny']),
+})
+
+# CR/LF included: PSSession feeds one command per stdin line, so a newline
+# in a param would start a second, unverified command
+PS_ILLEGAL_CHARS = r'[|;`\$(){}[\]\\\r\n]'
+
+_ACTION_RE = re.compile(r'^[a-z]+\.[a-z]+$')
+_ILLEGAL_RE = re.compile(PS_ILLEGAL_CHARS)
+_SQ, _SQ2 = "'", "''"  # PowerShell escapes ' inside single quotes by doubling it
+_DENY = frozenset(PS_COMMAND_REGISTRY['deny'])
+_ALLOW = {
+    action: {'cmdlet': spec['cmdlet'], 'params': frozenset(spec['params'])}
+    for action, spec in PS_COMMAND_REGISTRY['allow'].items()
+}
 
 def ps_dsl_verify(intent):
     """XCFE-Grade PS-DSL Verifier - Deny-by-default"""
-    import re
-
     if intent.get('@dsl') != 'ps-dsl.v1':
         return False, "BAD_DSL", None
 
     action = intent.get('action', '')
-    if not action or not re.match(r'^[a-z]+.[a-z]+$', action):
+    if not action or not _ACTION_RE.match(action):
         return False, "BAD_ACTION", None
 
-    spec = PS_COMMAND_REGISTRY['allow'].get(action)
+    spec = _ALLOW.get(action)
     if not spec:
         return False, "ACTION_NOT_ALLOWLISTED", None
 
@@ -338,10 +487,10 @@ def ps_dsl_verify(intent):
     for key, value in params.items():
         if key not in spec['params']:
             return False, f"PARAM_NOT_ALLOWED: {key}", None
-        if isinstance(value, str) and re.search(PS_ILLEGAL_CHARS, value):
+        if isinstance(value, str) and _ILLEGAL_RE.search(value):
             return False, f"ILLEGAL_PARAM_CHARS: {key}", None
 
-    if spec['cmdlet'] in PS_COMMAND_REGISTRY['deny']:
+    if spec['cmdlet'] in _DENY:
         return False, "CMDLET_DENIED", None
 
     lowered = ps_dsl_lower(spec['cmdlet'], params)
@@ -351,7 +500,7 @@ def ps_dsl_lower(cmdlet, params):
     """Lower PS-DSL intent to single PowerShell cmdlet"""
     if not params:
         return cmdlet
-    args = ' '.join(f"-{k} '{str(v).replace(chr(39), chr(39)+chr(39))}'" for k, v in params.items())
+    args = ' '.join(f"-{k} '{str(v).replace(_SQ, _SQ2)}'" for k, v in params.items())
     return f"{cmdlet} {args}"
 
 def cm1_wrap(lowered, meta=None):
@@ -362,12 +511,8 @@ def cm1_wrap(lowered, meta=None):
     header = GS.join(header_parts)
     return f"{SOH}{header}{STX}{lowered}{ETX}{EOT}"
 
-def ps_execute_dsl(intent, audit=True):
-    """Execute PS-DSL intent with full XCFE verification + CM-1 audit"""
-    import datetime
-
-    is_valid, reason, lowered = ps_dsl_verify(intent)
-
+def _cm1_envelope(intent, is_valid, reason, lowered, audit):
+    """Build the CM-1 audit record for a verified (or blocked) intent"""
     cm1_envelope = {
         'soh': '[SOH] ps-envelope.v1',
         'dsl': intent.get('@dsl'),
@@ -382,24 +527,177 @@ def ps_execute_dsl(intent, audit=True):
         status_icon = '✓' if is_valid else '✗'
         print(f"[CM-1] {status_icon} {cm1_envelope['status'].upper()}: {reason}")
 
+    return cm1_envelope
+
+# One codec for every PowerShell pipe (session, batch, raw mode). Defaults to
+# the locale encoding, as text=True did; override e.g. with 'utf-8' for pwsh
+PS_ENCODING = _env('MX2LM_PS_ENCODING') or locale.getpreferredencoding(False)
+
+PS_SESSION_END = '---MX2LM-END---'
+
+class PSSession:
+    """
+    Long-lived PowerShell reading commands from stdin, so each PS-DSL call
+    pays cmdlet time only instead of a fresh PowerShell startup.
+    Stdout and stderr stay separate pipes, each drained by its own reader
+    thread. After every command a sentinel line is written to both streams;
+    the stdout one carries the command's own $? (and $LASTEXITCODE), captured
+    before its output is piped through Out-String.
+    """
+
+    def __init__(self, timeout: float = 30):
+        exe = shutil.which('pwsh') or 'powershell'
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.proc = subprocess.Popen(
+            [exe, '-NoProfile', '-NoLogo', '-Command', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            encoding=PS_ENCODING, errors='replace', bufsize=1
+        )
+        self.out_lines: queue.Queue = queue.Queue()
+        self.err_lines: queue.Queue = queue.Queue()
+        for stream, lines, name in ((self.proc.stdout, self.out_lines, "PSSessionStdout"),
+                                    (self.proc.stderr, self.err_lines, "PSSessionStderr")):
+            threading.Thread(target=self._pump, args=(stream, lines), daemon=True, name=name).start()
+
+    @staticmethod
+    def _pump(stream, lines: queue.Queue):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    @staticmethod
+    def _script(lowered: str) -> str:
+        """One stdin line: run the cmdlet, record its status, then emit both sentinels"""
+        # try/catch: a terminating error would otherwise abort the line
+        # before the sentinels and stall the reader until the timeout
+        return (
+            f"$global:LASTEXITCODE = 0; "
+            f"try {{ $__mx2lm_out = {lowered}; $__mx2lm_ok = $? -and $LASTEXITCODE -eq 0 }} "
+            f"catch {{ $__mx2lm_out = $null; $__mx2lm_ok = $false; [Console]::Error.WriteLine($_) }}; "
+            f"$__mx2lm_out | Out-String; "
+            f"Write-Output ('{PS_SESSION_END}' + $__mx2lm_ok); "
+            f"[Console]::Error.WriteLine('{PS_SESSION_END}')\n"
+        )
+
+    def _read_until_end(self, lines: queue.Queue) -> Tuple[str, str]:
+        """Lines up to the next sentinel, and the sentinel line's suffix"""
+        output = []
+        while True:
+            try:
+                line = lines.get(timeout=self.timeout)
+            except queue.Empty:
+                self.close()
+                raise TimeoutError(f"PowerShell session timed out after {self.timeout}s")
+            if line is None:
+                raise RuntimeError("PowerShell session exited")
+            if line.startswith(PS_SESSION_END):
+                return ''.join(output), line[len(PS_SESSION_END):].strip()
+            output.append(line)
+
+    def execute_many(self, lowered: List[str]) -> List[Tuple[bool, str, str]]:
+        """Run lowered cmdlets in order; returns (success, stdout, stderr) for each"""
+        with self.lock:
+            self.proc.stdin.write(''.join(map(self._script, lowered)))
+            self.proc.stdin.flush()
+            results = []
+            for _ in lowered:
+                output, status = self._read_until_end(self.out_lines)
+                error, _ = self._read_until_end(self.err_lines)
+                results.append((status == 'True', output, error))
+            return results
+
+    def execute(self, lowered: str) -> Tuple[bool, str, str]:
+        """Run one lowered cmdlet; returns (success, stdout, stderr)"""
+        return self.execute_many([lowered])[0]
+
+    def close(self):
+        if self.alive():
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+
+_PS = threading.local()
+_PS_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ps-dsl')
+
+def _ps_session() -> PSSession:
+    """
+    This thread's PowerShell session, (re)started on first use or after it
+    exits. One session per thread lets ps_gather probes run side by side.
+    """
+    session = getattr(_PS, 'session', None)
+    if session is None or not session.alive():
+        session = _PS.session = PSSession()
+        atexit.register(session.close)
+    return session
+
+def ps_execute_dsl(intent, audit=True):
+    """Execute PS-DSL intent with full XCFE verification + CM-1 audit"""
+    is_valid, reason, lowered = ps_dsl_verify(intent)
+    cm1_envelope = _cm1_envelope(intent, is_valid, reason, lowered, audit)
+
     if not is_valid:
         return {'success': False, 'error': reason, 'cm1': cm1_envelope}
 
     try:
-        result = subprocess.run(
-            ['powershell', '-NoProfile', '-Command', lowered],
-            capture_output=True, text=True, timeout=30
-        )
+        success, output, error = _ps_session().execute(lowered)
         return {
-            'success': result.returncode == 0,
-            'output': result.stdout,
-            'error': result.stderr if result.returncode != 0 else None,
+            'success': success,
+            'output': output,
+            'error': error if not success else None,
             'cm1': cm1_envelope
         }
     except Exception as e:
         return {'success': False, 'error': str(e), 'cm1': cm1_envelope}
 
 
+def _decode_ps(data: bytes) -> str:
+    """Decode captured PowerShell output in one pass, normalizing CRLF"""
+    text = data.decode(PS_ENCODING, 'replace')
+    return text.replace('\r\n', '\n') if '\r' in text else text
+
+def ps_execute_batch(intents: List[dict], audit=True) -> List[dict]:
+    """
+    Execute several PS-DSL intents through this thread's PowerShell session,
+    written in one go. Each intent is verified and audited on its own; blocked
+    intents never reach the shell. Results keep intent order, and each
+    executed intent reports its own status, stdout and stderr.
+    """
+    results: List[Optional[dict]] = [None] * len(intents)
+    runnable = []
+    for i, intent in enumerate(intents):
+        is_valid, reason, lowered = ps_dsl_verify(intent)
+        cm1_envelope = _cm1_envelope(intent, is_valid, reason, lowered, audit)
+        if is_valid:
+            runnable.append((i, lowered, cm1_envelope))
+        else:
+            results[i] = {'success': False, 'error': reason, 'cm1': cm1_envelope}
+
+    if not runnable:
+        return results
+
+    try:
+        outcomes = _ps_session().execute_many([lowered for _, lowered, _ in runnable])
+    except Exception as e:
+        for i, _, cm1_envelope in runnable:
+            results[i] = {'success': False, 'error': str(e), 'cm1': cm1_envelope}
+        return results
+
+    for (i, _, cm1_envelope), (success, output, error) in zip(runnable, outcomes):
+        results[i] = {
+            'success': success,
+            'output': output,
+            'error': error if not success else None,
+            'cm1': cm1_envelope
+        }
+    return results
+
+
 # ═══════════════════════════════════════════════════════════════
 # PS-DSL HELPER FUNCTIONS (Safe, Allowlisted Operations)
 # ═══════════════════════════════════════════════════════════════
@@ -458,6 +756,15 @@ def ps_get_disks():
     return ps_execute_dsl({'@dsl': 'ps-dsl.v1', 'action': 'disk.list', 'params': {}})
 
 
+def ps_gather(*fns) -> list:
+    """
+    Run independent ps_* helpers concurrently, e.g.
+    ps_gather(ps_get_processes, ps_get_services, ps_get_disks).
+    Results keep argument order.
+    """
+    return list(_PS_POOL.map(lambda fn: fn(), fns))
+
+
 # ═══════════════════════════════════════════════════════════════
 # MAIN CLI ENTRY POINT
 # ═══════════════════════════════════════════════════════════════
@@ -539,11 +846,11 @@ def main():
                 try:
                     ps_res = subprocess.run(
                         ['powershell', '-NoProfile', '-Command', user_input],
-                        capture_output=True, text=True, timeout=60
+                        capture_output=True, timeout=60
                     )
-                    print(ps_res.stdout)
+                    print(_decode_ps(ps_res.stdout))
                     if ps_res.stderr:
-                        print('[PowerShell error]', ps_res.stderr)
+                        print('[PowerShell error]', _decode_ps(ps_res.stderr))
                 except Exception as e:
                     print('[PowerShell exec error]', e)
                 continue
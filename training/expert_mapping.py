@@ -11,10 +11,17 @@ Usage:
 
 import argparse
 import json
+import sys
+from collections import defaultdict
 from dataclasses import dataclass
 from typing import Dict, List, Set
 from pathlib import Path
 
+try:  # Optional: faster JSON export
+    import orjson
+except ImportError:
+    orjson = None
+
 # ============================================================================
 # Expert Taxonomy (108 total: 89 defined + 19 reserved)
 # ============================================================================
@@ -154,70 +161,74 @@ DATASET_MAPPING = {
 # Analysis Functions
 # ============================================================================
 
+# Reverse indexes, built once: expert -> datasets and expert -> summed weight
+_ALL_EXPERTS = tuple(
+    expert for data in EXPERT_TAXONOMY.values() for expert in data["experts"]
+)
+_EXPERT_DATASETS: Dict[str, List[str]] = defaultdict(list)
+_EXPERT_WEIGHT: Dict[str, float] = defaultdict(float)
+for _dataset_id, _data in DATASET_MAPPING.items():
+    for _expert in _data["experts"]:
+        _EXPERT_DATASETS[_expert].append(_dataset_id)
+        _EXPERT_WEIGHT[_expert] += _data["weight"]
+_COVERED = frozenset(_EXPERT_DATASETS)
+_CATEGORY_EXPERT_SETS = {
+    category: frozenset(data["experts"]) for category, data in EXPERT_TAXONOMY.items()
+}
+
+
 def get_all_experts() -> List[str]:
     """Get all expert IDs"""
-    experts = []
-    for category, data in EXPERT_TAXONOMY.items():
-        experts.extend(data["experts"])
-    return experts
+    return list(_ALL_EXPERTS)
 
 
 def get_covered_experts() -> Set[str]:
     """Get experts that have training data"""
-    covered = set()
-    for dataset in DATASET_MAPPING.values():
-        covered.update(dataset["experts"])
-    return covered
+    return set(_COVERED)
 
 
 def get_uncovered_experts() -> Set[str]:
     """Get experts without training data"""
-    all_experts = set(get_all_experts())
-    covered = get_covered_experts()
-    return all_experts - covered
+    return set(_ALL_EXPERTS) - _COVERED
 
 
 def get_expert_datasets(expert_id: str) -> List[str]:
     """Get datasets that train a specific expert"""
-    datasets = []
-    for dataset_id, data in DATASET_MAPPING.items():
-        if expert_id in data["experts"]:
-            datasets.append(dataset_id)
-    return datasets
+    return list(_EXPERT_DATASETS.get(expert_id, ()))
 
 
 def compute_expert_weights() -> Dict[str, float]:
     """Compute training weight for each expert"""
-    weights = {}
-    for expert in get_all_experts():
-        total_weight = 0.0
-        for dataset_id, data in DATASET_MAPPING.items():
-            if expert in data["experts"]:
-                total_weight += data["weight"]
-        weights[expert] = total_weight
-    return weights
+    return {expert: _EXPERT_WEIGHT.get(expert, 0.0) for expert in _ALL_EXPERTS}
 
 
 # ============================================================================
 # Display Functions
 # ============================================================================
 
+_SEP70 = "=" * 70
+_SEP50 = "-" * 50
+_COVERAGE_BARS = ["█" * i + "░" * (20 - i) for i in range(21)]  # one step per 5%
+
+
 def show_mapping():
     """Display the expert-to-dataset mapping"""
-    print("\n" + "=" * 70)
-    print(" K'UHUL Expert-to-Dataset Mapping")
-    print("=" * 70)
+    # Buffered and written once: one stdout write instead of a print per line
+    out = []
+    w = out.append
+    w(f"\n{_SEP70}\n K'UHUL Expert-to-Dataset Mapping\n{_SEP70}\n")
 
     for category, data in EXPERT_TAXONOMY.items():
-        print(f"\n{category.upper()} ({data['parent']})")
-        print("-" * 50)
+        w(f"\n{category.upper()} ({data['parent']})\n{_SEP50}\n")
 
         for expert in data["experts"]:
             datasets = get_expert_datasets(expert)
             if datasets:
-                print(f"  {expert:25} <- {', '.join(datasets)}")
+                w(f"  {expert:25} <- {', '.join(datasets)}\n")
             else:
-                print(f"  {expert:25} <- (no data)")
+                w(f"  {expert:25} <- (no data)\n")
+
+    sys.stdout.write("".join(out))
 
 
 def show_coverage():
@@ -227,68 +238,79 @@ def show_coverage():
     uncovered = get_uncovered_experts()
     weights = compute_expert_weights()
 
-    print("\n" + "=" * 70)
-    print(" K'UHUL Training Coverage Analysis")
-    print("=" * 70)
+    out = []
+    w = out.append
+    w(f"\n{_SEP70}\n K'UHUL Training Coverage Analysis\n{_SEP70}\n")
 
-    print(f"\n SUMMARY")
-    print(f"   Total experts:     {len(all_experts)}")
-    print(f"   Covered by data:   {len(covered)} ({100*len(covered)/len(all_experts):.1f}%)")
-    print(f"   Uncovered:         {len(uncovered)} ({100*len(uncovered)/len(all_experts):.1f}%)")
+    w(f"\n SUMMARY\n")
+    w(f"   Total experts:     {len(all_experts)}\n")
+    w(f"   Covered by data:   {len(covered)} ({100*len(covered)/len(all_experts):.1f}%)\n")
+    w(f"   Uncovered:         {len(uncovered)} ({100*len(uncovered)/len(all_experts):.1f}%)\n")
 
-    print(f"\n DATASETS ({len(DATASET_MAPPING)})")
+    w(f"\n DATASETS ({len(DATASET_MAPPING)})\n")
     for dataset_id, data in DATASET_MAPPING.items():
-        print(f"   {dataset_id:20} -> {len(data['experts'])} experts (weight: {data['weight']})")
+        w(f"   {dataset_id:20} -> {len(data['experts'])} experts (weight: {data['weight']})\n")
 
-    print(f"\n CATEGORY COVERAGE")
-    for category, data in EXPERT_TAXONOMY.items():
-        cat_experts = set(data["experts"])
+    w(f"\n CATEGORY COVERAGE\n")
+    for category, cat_experts in _CATEGORY_EXPERT_SETS.items():
         cat_covered = cat_experts & covered
         pct = 100 * len(cat_covered) / len(cat_experts) if cat_experts else 0
-        bar = "█" * int(pct / 5) + "░" * (20 - int(pct / 5))
-        print(f"   {category:12} {bar} {pct:5.1f}% ({len(cat_covered)}/{len(cat_experts)})")
+        bar = _COVERAGE_BARS[int(pct / 5)]
+        w(f"   {category:12} {bar} {pct:5.1f}% ({len(cat_covered)}/{len(cat_experts)})\n")
 
-    print(f"\n UNCOVERED EXPERTS")
+    w(f"\n UNCOVERED EXPERTS\n")
     for expert in sorted(uncovered):
         if not expert.startswith("reserved-"):
-            print(f"   - {expert}")
+            w(f"   - {expert}\n")
 
-    print(f"\n TOP WEIGHTED EXPERTS")
+    w(f"\n TOP WEIGHTED EXPERTS\n")
     sorted_weights = sorted(weights.items(), key=lambda x: x[1], reverse=True)
     for expert, weight in sorted_weights[:10]:
         if weight > 0:
-            print(f"   {expert:25} weight: {weight:.2f}")
+            w(f"   {expert:25} weight: {weight:.2f}\n")
+
+    sys.stdout.write("".join(out))
 
 
 def show_datasets():
     """Show dataset details"""
-    print("\n" + "=" * 70)
-    print(" K'UHUL Training Datasets")
-    print("=" * 70)
+    out = []
+    w = out.append
+    w(f"\n{_SEP70}\n K'UHUL Training Datasets\n{_SEP70}\n")
 
     for dataset_id, data in DATASET_MAPPING.items():
-        print(f"\n {dataset_id}")
-        print(f"   Source:   {data['name']}")
-        print(f"   Weight:   {data['weight']}")
-        print(f"   Features: {', '.join(data['features'])}")
-        print(f"   Experts:  {', '.join(data['experts'])}")
+        w(f"\n {dataset_id}\n")
+        w(f"   Source:   {data['name']}\n")
+        w(f"   Weight:   {data['weight']}\n")
+        w(f"   Features: {', '.join(data['features'])}\n")
+        w(f"   Experts:  {', '.join(data['experts'])}\n")
+
+    sys.stdout.write("".join(out))
 
 
 def export_mapping(format: str, output: str):
     """Export mapping to file"""
+    # The getters return fresh copies of the module-level indexes; fetch each once
+    covered = get_covered_experts()
+
     if format == "json":
+        all_experts = get_all_experts()
         data = {
             "taxonomy": EXPERT_TAXONOMY,
             "datasets": DATASET_MAPPING,
             "coverage": {
-                "total": len(get_all_experts()),
-                "covered": len(get_covered_experts()),
-                "uncovered": list(get_uncovered_experts()),
+                "total": len(all_experts),
+                "covered": len(covered),
+                "uncovered": sorted(set(all_experts) - covered),
             },
             "weights": compute_expert_weights(),
         }
-        with open(output, 'w') as f:
-            json.dump(data, f, indent=2)
+        if orjson is not None:
+            with open(output, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output, 'w') as f:
+                json.dump(data, f, indent=2)
         print(f"Exported to {output}")
 
     elif format == "markdown":
@@ -302,9 +324,7 @@ def export_mapping(format: str, output: str):
                 f.write(f"| {did} | {data['name']} | {len(data['experts'])} | {data['weight']} |\n")
 
             f.write("\n## Coverage by Category\n\n")
-            covered = get_covered_experts()
-            for category, data in EXPERT_TAXONOMY.items():
-                cat_experts = set(data["experts"])
+            for category, cat_experts in _CATEGORY_EXPERT_SETS.items():
                 cat_covered = cat_experts & covered
                 pct = 100 * len(cat_covered) / len(cat_experts) if cat_experts else 0
                 f.write(f"- **{category}**: {pct:.0f}% ({len(cat_covered)}/{len(cat_experts)})\n")
@@ -13,15 +13,42 @@ Usage:
 """
 
 import argparse
+import gc
+import hashlib
 import json
+import mmap
 import os
 import subprocess
 import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 import logging
 
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # Optional: faster JSONL decoding/encoding
+    orjson = None
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+try:  # Optional: SIMD field extraction for RLHF samples (pysimdjson)
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:  # Optional: streaming decode of very large .json arrays
+    import ijson
+except ImportError:
+    ijson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -205,21 +232,120 @@ class DatasetDownloader:
             logger.error("huggingface-cli not found. Install with: pip install huggingface_hub")
             raise
 
-    def download_all(self, datasets: List[DatasetConfig]) -> Dict[str, Path]:
-        """Download all datasets"""
-        paths = {}
-        for dataset in datasets:
-            try:
-                paths[dataset.id] = self.download(dataset)
-            except Exception as e:
-                logger.error(f"Skipping {dataset.id}: {e}")
-        return paths
+    def download_all(self, datasets: List[DatasetConfig], workers: int = 8) -> Dict[str, Path]:
+        """Download all datasets (clones are network-bound, so run them on threads)"""
+        if not datasets:
+            return {}
+
+        done = {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(datasets))) as pool:
+            futures = {pool.submit(self.download, dataset): dataset for dataset in datasets}
+            for future in as_completed(futures):
+                dataset = futures[future]
+                try:
+                    done[dataset.id] = future.result()
+                except Exception as e:
+                    logger.error(f"Skipping {dataset.id}: {e}")
+
+        # Keep the config order regardless of which clone finished first
+        return {d.id: done[d.id] for d in datasets if d.id in done}
 
 
 # ============================================================================
 # Data Processor
 # ============================================================================
 
+# Sampling weight of RLHF samples relative to HuggingFace dataset samples
+RLHF_SAMPLE_WEIGHT = 2.0
+PREPARED_FORMAT_VERSION = "v1"  # bump when format_sample/_write_prepared output changes
+
+def _iter_jsonl_bytes(path: Path):
+    """Stripped, non-empty lines of a JSONL file, scanned from an mmap"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap rejects empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                line = line.strip()
+                if line:
+                    yield line
+
+
+# Candidate instruction/response field names, in priority order
+_INSTRUCTION_FIELDS = ('instruction', 'prompt', 'input', 'question', 'query', 'user')
+_RESPONSE_FIELDS = ('response', 'output', 'answer', 'assistant', 'completion', 'code')
+_SAMPLE_FIELDS = frozenset(_INSTRUCTION_FIELDS + _RESPONSE_FIELDS)
+
+
+def _first_field(sample: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[str]:
+    """First non-empty value among fields, as a string"""
+    for field in fields:
+        value = sample.get(field)
+        if value:
+            return str(value)
+    return None
+
+
+# .json files above this size are streamed with ijson instead of read whole
+STREAM_JSON_BYTES = 256 << 20
+
+
+def _is_json_array(file: Path) -> bool:
+    """True if the file's first non-whitespace byte opens a JSON array"""
+    with open(file, 'rb') as f:
+        head = f.read(4096).lstrip()
+    return head[:1] == b'['
+
+
+def _stat_key(path) -> Tuple[int, int]:
+    """(size, mtime_ns) of a file, for cache keys"""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _parse_one(file: Path) -> List[Any]:
+    """
+    Samples from one .json/.jsonl file. Module-level so worker processes can
+    unpickle it; a file that fails to decode contributes nothing.
+    """
+    try:
+        if file.suffix == '.jsonl':
+            return [_loads(line) for line in _iter_jsonl_bytes(file)]
+        if ijson is not None and file.stat().st_size > STREAM_JSON_BYTES and _is_json_array(file):
+            # Never hold the raw file and the decoded array at the same time
+            with open(file, 'rb') as f:
+                return list(ijson.items(f, 'item', use_float=True))
+        data = _loads(file.read_bytes())
+        return data if isinstance(data, list) else [data]
+    except Exception as e:
+        logger.warning(f"Error loading {file}: {e}")
+        return []
+
+
+def _plain(value: Any) -> Any:
+    """Copy a simdjson Object/Array proxy out of the parser's buffer"""
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+
+def _rlhf_fields(parser: "simdjson.Parser", line: bytes) -> Tuple[Any, Any, Any, Any]:
+    """
+    (instruction, response, source, experts) from one rlhf_samples.jsonl line.
+    Returns plain Python values: the parser can only be reused once no proxy
+    into its previous document is alive.
+    """
+    doc = parser.parse(line)
+    return (
+        _plain(doc.get('instruction', '')),
+        _plain(doc.get('response', '')),
+        _plain(doc.get('source', 'unknown')),
+        _plain(doc.get('experts', ['lang-python'])),
+    )
+
+
 class DataProcessor:
     """Process and prepare datasets for training"""
 
@@ -231,21 +357,16 @@ class DataProcessor:
         samples = []
 
         if format == "json" or format == "jsonl":
-            for file in path.rglob("*.json*"):
-                try:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        if file.suffix == '.jsonl':
-                            for line in f:
-                                if line.strip():
-                                    samples.append(json.loads(line))
-                        else:
-                            data = json.load(f)
-                            if isinstance(data, list):
-                                samples.extend(data)
-                            else:
-                                samples.append(data)
-                except Exception as e:
-                    logger.warning(f"Error loading {file}: {e}")
+            files = list(path.rglob("*.json*"))
+            if len(files) <= 1:
+                for file in files:
+                    samples.extend(_parse_one(file))
+            else:
+                # Decoding is CPU-bound, so fan files out over processes;
+                # map() keeps rglob order
+                with ProcessPoolExecutor() as pool:
+                    for file_samples in pool.map(_parse_one, files):
+                        samples.extend(file_samples)
 
         elif format == "parquet":
             try:
@@ -261,22 +382,13 @@ class DataProcessor:
 
     def format_sample(self, sample: Dict[str, Any], dataset_id: str) -> Optional[Dict[str, str]]:
         """Format a sample into instruction/response format"""
-        # Try common field names
-        instruction_fields = ['instruction', 'prompt', 'input', 'question', 'query', 'user']
-        response_fields = ['response', 'output', 'answer', 'assistant', 'completion', 'code']
-
         instruction = None
         response = None
 
-        for field in instruction_fields:
-            if field in sample and sample[field]:
-                instruction = str(sample[field])
-                break
-
-        for field in response_fields:
-            if field in sample and sample[field]:
-                response = str(sample[field])
-                break
+        # Try common field names; one set test skips samples that have none
+        if not _SAMPLE_FIELDS.isdisjoint(sample):
+            instruction = _first_field(sample, _INSTRUCTION_FIELDS)
+            response = _first_field(sample, _RESPONSE_FIELDS)
 
         # Handle conversation format
         if 'conversations' in sample:
@@ -315,61 +427,119 @@ class DataProcessor:
             logger.warning(f"No RLHF data found at {rlhf_file}")
             return samples
 
-        with open(rlhf_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        sample = json.loads(line)
-                        samples.append({
-                            'instruction': sample.get('instruction', ''),
-                            'response': sample.get('response', ''),
-                            'dataset': f"rlhf-{sample.get('source', 'unknown')}",
-                            'experts': sample.get('experts', ['lang-python']),
-                            'category': 'rlhf',
-                        })
-                    except json.JSONDecodeError:
-                        continue
+        # One reused simdjson parser; only the four fields below are materialized
+        parser = simdjson.Parser() if simdjson is not None else None
+        for line in _iter_jsonl_bytes(rlhf_file):
+            try:
+                if parser is not None:
+                    instruction, response, source, experts = _rlhf_fields(parser, line)
+                else:
+                    sample = _loads(line)
+                    instruction = sample.get('instruction', '')
+                    response = sample.get('response', '')
+                    source = sample.get('source', 'unknown')
+                    experts = sample.get('experts', ['lang-python'])
+            except ValueError:  # json/orjson JSONDecodeError, simdjson parse errors
+                continue
+            samples.append({
+                'instruction': instruction,
+                'response': response,
+                'dataset': f"rlhf-{source}",
+                'experts': experts,
+                'category': 'rlhf',
+            })
 
         logger.info(f"Loaded {len(samples)} RLHF samples from {rlhf_file}")
         return samples
 
-    def prepare_dataset(
-        self,
+    @staticmethod
+    def _prepared_cache_key(
         datasets: Dict[str, Tuple[Path, DatasetConfig]],
         rlhf_path: Optional[Path] = None
-    ) -> Tuple[List[Dict], List[Dict]]:
-        """Prepare all datasets for training"""
-        all_samples = []
+    ) -> str:
+        """Hash of every input file's path, size and mtime plus the per-dataset settings"""
+        entries = [PREPARED_FORMAT_VERSION]
+        for dataset_id, (path, config) in sorted(datasets.items()):
+            pattern = "*.parquet" if config.format == "parquet" else "*.json*"
+            files = sorted(str(f) for f in path.rglob(pattern))
+            entries.append([dataset_id, config.format, config.experts, config.category,
+                            [(f, *_stat_key(f)) for f in files]])
+        if rlhf_path and rlhf_path.exists():
+            rlhf_file = rlhf_path / "rlhf_samples.jsonl"
+            if rlhf_file.exists():
+                entries.append([str(rlhf_file), *_stat_key(rlhf_file), RLHF_SAMPLE_WEIGHT])
+        return hashlib.blake2b(_dumps(entries), digest_size=16).hexdigest()
 
+    def _write_prepared(
+        self,
+        out,
+        datasets: Dict[str, Tuple[Path, DatasetConfig]],
+        rlhf_path: Optional[Path] = None
+    ):
+        """Format every source sample and write it to out as one JSONL line"""
         # Load HuggingFace datasets
         for dataset_id, (path, config) in datasets.items():
-            raw_samples = self.load_dataset(path, config.format)
-
-            for sample in raw_samples:
+            for sample in self.load_dataset(path, config.format):
                 formatted = self.format_sample(sample, dataset_id)
                 if formatted:
                     # Add expert routing info
                     formatted['experts'] = config.experts
                     formatted['category'] = config.category
-                    all_samples.append(formatted)
+                    formatted['weight'] = 1.0
+                    out.write(_dumps(formatted) + b"\n")
 
         # Load custom RLHF data (higher weight)
         if rlhf_path and rlhf_path.exists():
             rlhf_samples = self.load_rlhf_data(rlhf_path)
-            # RLHF data gets 2x weight by duplicating
-            all_samples.extend(rlhf_samples)
-            all_samples.extend(rlhf_samples)  # 2x weight
-            logger.info(f"Added {len(rlhf_samples)} RLHF samples (2x weighted)")
+            # Weighted at sampling time (see AtomicExpertTrainer.train) rather
+            # than by duplicating, which doubled memory and tokenization
+            for sample in rlhf_samples:
+                sample['weight'] = RLHF_SAMPLE_WEIGHT
+                out.write(_dumps(sample) + b"\n")
+            logger.info(f"Added {len(rlhf_samples)} RLHF samples ({RLHF_SAMPLE_WEIGHT:g}x weighted)")
+
+    def prepare_dataset(
+        self,
+        datasets: Dict[str, Tuple[Path, DatasetConfig]],
+        rlhf_path: Optional[Path] = None
+    ) -> Tuple["Dataset", "Dataset"]:
+        """
+        Prepare all datasets for training.
+        Formatted samples are streamed to a JSONL file and loaded back as a
+        memory-mapped Arrow dataset, so they never sit in RAM as one list.
+        """
+        from datasets import Dataset, load_dataset as load_hf_dataset
+
+        # Keyed on the source files, so warm starts skip parsing and formatting
+        # entirely and load_dataset maps its existing Arrow cache
+        cache_key = self._prepared_cache_key(datasets, rlhf_path)
+        prepared_file = Path(self.config.output_dir) / "prepared" / f"{cache_key}.jsonl"
+        if prepared_file.exists():
+            logger.info(f"Reusing prepared samples: {prepared_file}")
+        else:
+            prepared_file.parent.mkdir(parents=True, exist_ok=True)
+            partial = prepared_file.with_suffix(".tmp")
+            with open(partial, 'wb') as out:
+                self._write_prepared(out, datasets, rlhf_path)
+            os.replace(partial, prepared_file)  # a crash never leaves a truncated cache
+
+        # Earlier keys are superseded by this one; don't let them pile up
+        for stale in prepared_file.parent.glob("*.jsonl"):
+            if stale != prepared_file:
+                stale.unlink(missing_ok=True)
+
+        if prepared_file.stat().st_size == 0:
+            empty = Dataset.from_list([])
+            return empty, empty
 
         # Shuffle
-        import random
-        random.seed(self.config.shuffle_seed)
-        random.shuffle(all_samples)
+        dataset = load_hf_dataset('json', data_files=str(prepared_file), split='train')
+        dataset = dataset.shuffle(seed=self.config.shuffle_seed)
 
         # Split
-        split_idx = int(len(all_samples) * (1 - self.config.validation_split))
-        train_samples = all_samples[:split_idx]
-        val_samples = all_samples[split_idx:]
+        split_idx = int(len(dataset) * (1 - self.config.validation_split))
+        train_samples = dataset.select(range(split_idx))
+        val_samples = dataset.select(range(split_idx, len(dataset)))
 
         logger.info(f"Train samples: {len(train_samples)}, Val samples: {len(val_samples)}")
         return train_samples, val_samples
@@ -460,37 +630,63 @@ class AtomicExpertTrainer:
             greater_is_better=False,
         )
 
-    def tokenize_dataset(self, samples: List[Dict], tokenizer) -> "Dataset":
-        """Tokenize samples into a HF Dataset"""
-        from datasets import Dataset
-
-        def format_text(sample):
-            text = self.config.context_template.format(
-                instruction=sample['instruction'],
-                response=sample['response']
-            )
-            return {"text": text}
-
-        # Create dataset
-        dataset = Dataset.from_list(samples)
-        dataset = dataset.map(format_text)
-
-        # Tokenize
-        def tokenize(examples):
-            return tokenizer(
-                examples["text"],
-                truncation=True,
-                max_length=self.config.max_sequence_length,
-                padding="max_length",
-            )
+    def tokenize_dataset(self, dataset: "Dataset", tokenizer) -> "Dataset":
+        """Tokenize a prepared samples Dataset"""
+        template = self.config.context_template
+        max_length = self.config.max_sequence_length
+
+        # Format and tokenize in one pass, so the text column never hits the
+        # Arrow cache. No padding: the collator pads each batch to its own
+        # longest sequence instead of storing max_sequence_length per sample
+        def format_and_tokenize(batch):
+            texts = [
+                template.format(instruction=instruction, response=response)
+                for instruction, response in zip(batch['instruction'], batch['response'])
+            ]
+            return tokenizer(texts, truncation=True, max_length=max_length)
+
+        # Keep the sampling weight for the weighted sampler and packing
+        dataset = dataset.map(
+            format_and_tokenize, batched=True, batch_size=2048, num_proc=os.cpu_count(),
+            remove_columns=[c for c in dataset.column_names if c != 'weight'],
+        )
 
-        dataset = dataset.map(tokenize, batched=True, remove_columns=["text"])
+        if self.config.pack_sequences:
+            dataset = self.pack_dataset(dataset, tokenizer)
         return dataset
 
+    def pack_dataset(self, dataset: "Dataset", tokenizer) -> "Dataset":
+        """
+        Concatenate tokenized samples (EOS-separated) and cut the stream into
+        max_sequence_length blocks, so no step is spent on padding. A block's
+        weight is the token-weighted mean of the samples it covers; the
+        partial block left at the end of each map batch is dropped.
+        """
+        block = self.config.max_sequence_length
+        eos = [tokenizer.eos_token_id] if tokenizer.eos_token_id is not None else []
+
+        def pack(batch):
+            ids, token_weights = [], []
+            for input_ids, weight in zip(batch['input_ids'], batch['weight']):
+                input_ids = input_ids + eos
+                ids.extend(input_ids)
+                token_weights.extend([weight] * len(input_ids))
+            starts = range(0, len(ids) - block + 1, block)
+            return {
+                'input_ids': [ids[i:i + block] for i in starts],
+                'attention_mask': [[1] * block for _ in starts],
+                'weight': [sum(token_weights[i:i + block]) / block for i in starts],
+            }
+
+        return dataset.map(
+            pack, batched=True, batch_size=1000, num_proc=os.cpu_count(),
+            remove_columns=dataset.column_names,
+        )
+
     def train(
         self,
-        train_samples: List[Dict],
-        val_samples: List[Dict],
+        train_samples: "Dataset",
+        val_samples: "Dataset",
         output_dir: Path,
         resume_from: Optional[str] = None
     ):
@@ -509,10 +705,29 @@ class AtomicExpertTrainer:
         data_collator = DataCollatorForLanguageModeling(
             tokenizer=tokenizer,
             mlm=False,
+            pad_to_multiple_of=16,  # per-batch padding, tensor-core aligned (Ampere: 8, Hopper: 16)
         )
 
+        # Oversample weighted (RLHF) samples instead of shuffling uniformly
+        trainer_cls = Trainer
+        # Read from the tokenized set: packing changes the row count
+        weights = list(train_dataset['weight']) if 'weight' in train_dataset.column_names else []
+        if len(set(weights)) > 1:
+            import torch
+            from torch.utils.data import WeightedRandomSampler
+
+            generator = torch.Generator().manual_seed(self.config.shuffle_seed)
+
+            class WeightedTrainer(Trainer):
+                def _get_train_sampler(self, *args, **kwargs):
+                    return WeightedRandomSampler(
+                        weights, num_samples=len(weights), replacement=True, generator=generator
+                    )
+
+            trainer_cls = WeightedTrainer
+
         # Create trainer
-        trainer = Trainer(
+        trainer = trainer_cls(
             model=model,
             args=training_args,
             train_dataset=train_dataset,
@@ -539,63 +754,149 @@ class AtomicExpertTrainer:
 # Expert Router Training
 # ============================================================================
 
+# Hashed text per expert: first EMBED_SAMPLES instructions, each cut to
+# EMBED_SAMPLE_CHARS
+EMBED_SAMPLES = 100
+EMBED_SAMPLE_CHARS = 256
+
+# Scales an int32 hash word into [-1, 1)
+_INV_2P31 = 1.0 / (1 << 31)
+
+# Rows decoded per batch while grouping instructions by expert
+EMBED_BATCH_ROWS = 10_000
+
+
+@lru_cache(maxsize=100_000)
+def _text_digest(text: str) -> bytes:
+    """64-byte hash of one instruction; cached, as instructions recur across experts"""
+    # No cryptographic need here: blake2b is much faster than SHA-512 in software
+    return hashlib.blake2b(text.encode(), digest_size=64).digest()
+
+
+def _expert_signature(texts: List[str]) -> "np.ndarray":
+    """
+    Placeholder embedding of one expert: the mean over its texts of each
+    digest read as 16 little-endian int32 words scaled to [-1, 1).
+    """
+    import numpy as np
+
+    words = np.frombuffer(b"".join(map(_text_digest, texts)), dtype='<i4').reshape(len(texts), -1)
+    return (words.mean(axis=0) * _INV_2P31).astype(np.float32)
+
+
+def _group_instructions(batch: "pa.Table", expert_texts: Dict[str, List[str]]):
+    """
+    Add one Arrow batch to expert_texts (expert -> instructions), exploding
+    the experts list column and grouping rows by expert with a stable sort.
+    Only the first EMBED_SAMPLES instructions per expert are hashed, so each
+    list stops there, with every kept instruction cut to EMBED_SAMPLE_CHARS.
+    Experts and instructions keep their first-seen order.
+    """
+    import numpy as np
+    import pyarrow.compute as pc
+
+    experts = batch.column('experts').combine_chunks()
+    flat = pc.list_flatten(experts)
+    rows = pc.list_parent_indices(experts).to_numpy()
+    if flat.null_count:
+        valid = pc.is_valid(flat)
+        flat = flat.filter(valid)
+        rows = rows[valid.to_numpy(zero_copy_only=False)]
+    if not len(flat):
+        return
+
+    # dictionary_encode numbers experts in first-seen order
+    encoded = flat.dictionary_encode()
+    names = encoded.dictionary.to_pylist()
+    codes = encoded.indices.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+
+    instructions = pc.utf8_slice_codeunits(batch.column('instruction'), 0, EMBED_SAMPLE_CHARS)
+    for start, end in zip(starts, ends):
+        texts = expert_texts[names[codes[start]]]
+        need = EMBED_SAMPLES - len(texts)
+        if need > 0:
+            texts.extend(instructions.take(rows[order[start:min(end, start + need)]]).to_pylist())
+
+
 class ExpertRouterTrainer:
     """Train the expert routing network"""
 
     def __init__(self, config: TrainingConfig):
         self.config = config
-        self.expert_embeddings = {}
+        # Row i of expert_matrix is the embedding of expert_ids[i]
+        self.expert_ids: List[str] = []
+        self.expert_matrix = None
 
-    def build_expert_embeddings(self, samples: List[Dict]) -> Dict[str, List[float]]:
+    def build_expert_embeddings(self, samples: "Dataset", dim: int = 512) -> Tuple[List[str], "np.ndarray"]:
         """Build embeddings for each expert based on training data"""
-        from collections import defaultdict
+        import numpy as np
 
         expert_texts = defaultdict(list)
 
-        for sample in samples:
-            for expert in sample.get('experts', []):
-                expert_texts[expert].append(sample['instruction'])
+        # Stream the two needed columns as Arrow batches off the memory-mapped
+        # table and group them with Arrow/NumPy kernels; only the instructions
+        # that are actually kept become Python strings
+        columns = samples.select_columns(['experts', 'instruction']).with_format("arrow")
+        for batch in columns.iter(batch_size=EMBED_BATCH_ROWS):
+            _group_instructions(batch, expert_texts)
 
         # For each expert, compute average embedding
         # This is a simplified version - in practice you'd use a proper encoder
         logger.info(f"Building embeddings for {len(expert_texts)} experts")
 
-        for expert_id, texts in expert_texts.items():
-            # Simple TF-IDF-like representation (placeholder)
-            self.expert_embeddings[expert_id] = self._compute_embedding(texts)
-
-        return self.expert_embeddings
-
-    def _compute_embedding(self, texts: List[str], dim: int = 512) -> List[float]:
-        """Compute a simple embedding from texts"""
-        import hashlib
-
-        # Simple hash-based embedding (placeholder for real embeddings)
-        combined = " ".join(texts[:100])  # Sample first 100
-        hash_bytes = hashlib.sha512(combined.encode()).digest()
+        # Simple TF-IDF-like representation (placeholder)
+        signatures = [_expert_signature(texts) for texts in expert_texts.values()]
 
-        # Convert to floats
-        embedding = []
-        for i in range(0, min(len(hash_bytes), dim * 4), 4):
-            val = int.from_bytes(hash_bytes[i:i+4], 'little', signed=True)
-            embedding.append(val / (2**31))
+        # One contiguous (num_experts, dim) float32 matrix, zero-padded to dim
+        matrix = np.zeros((len(signatures), dim), dtype=np.float32)
+        if signatures:
+            words = np.stack(signatures)[:, :dim]
+            matrix[:, :words.shape[1]] = words
 
-        # Pad or truncate to dim
-        while len(embedding) < dim:
-            embedding.append(0.0)
-
-        return embedding[:dim]
+        self.expert_ids = list(expert_texts)
+        self.expert_matrix = matrix
+        return self.expert_ids, self.expert_matrix
 
     def save_router(self, output_path: Path):
-        """Save the trained router"""
+        """
+        Save the trained router: scalar metadata and expert ids in router.json,
+        the embedding matrix (row i = expert_ids[i]) in binary router_embeddings.npz.
+        Embeddings are stored as int8 (value = int8 * embeddings_scale): they are
+        hash signatures in [-1, 1), so 8 bits keep their ranking and int8 dot
+        products work directly on the stored matrix.
+        """
+        import numpy as np
+
+        matrix = self.expert_matrix
+        if matrix is None:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        quantized = np.clip(np.rint(matrix * 127), -127, 127).astype(np.int8)
+
+        # Write each file under a .tmp name and os.replace it into place, so a
+        # crash mid-write never leaves a truncated router for the next run
+        embeddings_file = output_path / "router_embeddings.npz"
+        with open(embeddings_file.with_name(embeddings_file.name + ".tmp"), 'wb') as f:
+            np.savez_compressed(f, embeddings=quantized)
+        os.replace(f.name, embeddings_file)
+
         router_data = {
             "num_experts": self.config.num_experts,
             "active_experts": self.config.num_active_experts,
-            "embeddings": self.expert_embeddings,
+            "expert_ids": self.expert_ids,
+            "embeddings_file": "router_embeddings.npz",
+            "embeddings_dtype": "int8",
+            "embeddings_scale": 1 / 127,
         }
 
-        with open(output_path / "router.json", 'w') as f:
-            json.dump(router_data, f, indent=2)
+        # Compact: router.json is read by tooling, not by people
+        router_file = output_path / "router.json"
+        with open(router_file.with_name(router_file.name + ".tmp"), 'wb') as f:
+            f.write(_dumps(router_data))
+        os.replace(f.name, router_file)
 
         logger.info(f"Saved router to {output_path / 'router.json'}")
 
@@ -604,6 +905,17 @@ class ExpertRouterTrainer:
 # Main
 # ============================================================================
 
+def _has_expert_routing(samples: "Dataset") -> bool:
+    """True if any sample lists at least one expert; one Arrow pass over the column"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    experts = samples.with_format("arrow")["experts"]
+    if pa.types.is_null(experts.type):  # every row null: type never inferred
+        return False
+    return (pc.sum(pc.list_value_length(experts)).as_py() or 0) > 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="K'UHUL Atomic Expert Training Script"
@@ -650,7 +962,7 @@ def main():
     args = parser.parse_args()
 
     # Load config
-    config_path = Path(args.config)
+    config_path = Path(args.config).resolve()
     if not config_path.exists():
         logger.error(f"Config not found: {config_path}")
         sys.exit(1)
@@ -665,9 +977,13 @@ def main():
     if args.output:
         training_config.output_dir = args.output
 
-    output_dir = Path(training_config.output_dir)
-    datasets_dir = Path("datasets")
-    rlhf_dir = Path(args.rlhf)
+    # Resolve each path once; helpers receive these Path objects
+    output_dir = Path(training_config.output_dir).resolve()
+    training_config.output_dir = str(output_dir)
+    datasets_dir = Path("datasets").resolve()
+    rlhf_path = Path(args.rlhf).resolve()
+    if not rlhf_path.exists():
+        rlhf_path = None
 
     # Print config summary
     print("\n" + "=" * 60)
@@ -681,7 +997,7 @@ def main():
     print(f"  LoRA Rank:      {training_config.lora_rank}")
     print(f"  Epochs:         {training_config.epochs}")
     print(f"  Batch Size:     {training_config.batch_size} x {training_config.gradient_accumulation_steps}")
-    print(f"  RLHF Data:      {rlhf_dir if rlhf_dir.exists() else 'Not found'}")
+    print(f"  RLHF Data:      {rlhf_path or 'Not found'}")
     print(f"  RLHF Only:      {args.rlhf_only}")
     print("=" * 60 + "\n")
 
@@ -713,19 +1029,27 @@ def main():
                 dataset_map[dataset.id] = (dataset_paths[dataset.id], dataset)
 
     # Prepare datasets with optional RLHF data
-    rlhf_path = rlhf_dir if rlhf_dir.exists() else None
     train_samples, val_samples = processor.prepare_dataset(dataset_map, rlhf_path=rlhf_path)
 
     if not train_samples:
         logger.error("No training samples found!")
         sys.exit(1)
 
-    # Train expert router
-    logger.info("Training expert router...")
-    router_trainer = ExpertRouterTrainer(training_config)
-    router_trainer.build_expert_embeddings(train_samples)
     output_dir.mkdir(parents=True, exist_ok=True)
-    router_trainer.save_router(output_dir)
+
+    # Train expert router; skipped for single-expert configs, or when no
+    # training sample names any expert
+    if training_config.num_experts > 1 and _has_expert_routing(train_samples):
+        logger.info("Training expert router...")
+        router_trainer = ExpertRouterTrainer(training_config)
+        router_trainer.build_expert_embeddings(train_samples)
+        router_trainer.save_router(output_dir)
+        # Drop router-build state (matrix, digest cache) before the GPU phase
+        del router_trainer
+        _text_digest.cache_clear()
+        gc.collect()
+    else:
+        logger.info("Skipping expert router: no expert routing in this data/config")
 
     # Train model
     logger.info("Training model...")